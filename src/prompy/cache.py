@@ -5,7 +5,6 @@ This module handles the management of one-off prompt caches.
 """
 
 import logging
-import os
 import sys
 from pathlib import Path
 from typing import Optional, Tuple
@@ -113,15 +112,13 @@ def clear_cache(cache_dir: Path, project_name: str) -> bool:
 
     cache_file = get_cache_file_path(cache_dir, project_name)
 
-    if cache_file.exists():
-        try:
-            os.remove(cache_file)
-            return True
-        except Exception as e:
-            logger.error(f"Error clearing cache: {e}")
-            return False
-
-    return True  # No cache to clear is still a success
+    try:
+        # No cache to clear is still a success
+        cache_file.unlink(missing_ok=True)
+        return True
+    except Exception as e:
+        logger.error(f"Error clearing cache: {e}")
+        return False
 
 
 def append_to_cache(cache_dir: Path, project_name: str, content: str) -> bool:
@@ -536,6 +536,7 @@ def list(
     import json as json_lib
 
     from prompy.context import from_click_context
+    from prompy.output import is_output_redirected
 
     try:
         # Get prompt context and load all prompts
@@ -616,6 +617,7 @@ def list(
                 format == "detailed"
             ),  # Only include descriptions in detailed format
             category_filter=category_filter,  # Apply category filter if specified
+            color=not is_output_redirected(),  # Skip ANSI codes when piped
         )
 
         # Print header with filtering info
@@ -917,13 +919,7 @@ def detections(ctx: click.Context, validate: bool) -> None:
             return
 
         # Launch editor with an empty PromptFiles since we don't need fragment help text
-        empty_prompt_files = PromptFiles(
-            project_name=None,
-            language_name=None,
-            languages={},
-            projects={},
-            fragments={},
-        )
+        empty_prompt_files = PromptFiles()
 
         # Import here to avoid circular imports
         from prompy.editor import display_editor_success
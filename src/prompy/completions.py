@@ -89,6 +89,13 @@ end
 complete -c prompy -f -a "(__fish_prompy_complete)"
 """
 
+# The scripts are constant, so they are stripped once rather than on each call
+_COMPLETION_SCRIPTS = {
+    "bash": BASH_COMPLETION_TEMPLATE.strip(),
+    "zsh": ZSH_COMPLETION_TEMPLATE.strip(),
+    "fish": FISH_COMPLETION_TEMPLATE.strip(),
+}
+
 
 def get_completion_script(shell: str) -> str:
     """
@@ -100,14 +107,9 @@ def get_completion_script(shell: str) -> str:
     Returns:
         The shell completion script as a string
     """
-    if shell == "bash":
-        return BASH_COMPLETION_TEMPLATE.strip()
-    elif shell == "zsh":
-        return ZSH_COMPLETION_TEMPLATE.strip()
-    elif shell == "fish":
-        return FISH_COMPLETION_TEMPLATE.strip()
-    else:
+    if shell not in _COMPLETION_SCRIPTS:
         raise ValueError(f"Unsupported shell: {shell}")
+    return _COMPLETION_SCRIPTS[shell]
 
 
 def get_installation_instructions(shell: str) -> str:
@@ -2,10 +2,13 @@
 Configuration and file system structure for Prompy.
 """
 
+import fnmatch
+import functools
 import logging
 import os
+import re
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Pattern, Tuple
 
 import yaml
 
@@ -13,6 +16,10 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG_DIR = "~/.config/prompy"
 
+# Use PyYAML's libyaml bindings when it was built with them
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 def get_config_dir() -> Path:
     """
@@ -59,7 +66,7 @@ def ensure_config_dirs() -> Tuple[Path, Path, Path, Path]:
     detections_file = config_dir / "detections.yaml"
     if not detections_file.exists():
         with open(detections_file, "w") as f:
-            yaml.dump(get_default_detections(), f)
+            yaml.dump(get_default_detections(), f, Dumper=_YAML_DUMPER)
 
     return config_dir, prompts_dir, cache_dir, detections_file
 
@@ -94,29 +101,53 @@ def find_project_dir() -> Optional[Path]:
     Find the project directory by walking up from the current directory
     looking for common project markers.
 
+    Results are cached by current directory; see clear_project_dir_cache.
+
     Returns:
         Optional[Path]: The project directory path or None if not found
     """
-    current_dir = Path.cwd()
+    return _find_project_dir(str(Path.cwd()))
+
+
+@functools.lru_cache(maxsize=32)
+def _find_project_dir(current_dir: str) -> Optional[Path]:
+    """Walk up from current_dir to the first directory with a project marker."""
     project_markers = get_project_markers()
 
     # Walk up the directory tree
-    while current_dir != current_dir.parent:
+    parent_dir = os.path.dirname(current_dir)
+    while current_dir != parent_dir:
         # Check all project markers
-        for marker in project_markers:
-            marker_path = current_dir / marker
-            if marker_path.exists():
-                # Found project directory
-                logger.debug(
-                    f"Found project directory at {current_dir} with marker {marker}"
-                )
-                return current_dir
-
-        current_dir = current_dir.parent
+        marker = next(
+            (
+                marker
+                for marker in project_markers
+                if os.path.exists(os.path.join(current_dir, marker))
+            ),
+            None,
+        )
+        if marker is not None:
+            # Found project directory
+            logger.debug(
+                f"Found project directory at {current_dir} with marker {marker}"
+            )
+            return Path(current_dir)
+
+        current_dir, parent_dir = parent_dir, os.path.dirname(parent_dir)
 
     return None
 
 
+def clear_project_dir_cache() -> None:
+    """
+    Forget cached find_project_dir results.
+
+    Call this after project markers are added or removed in directories that
+    have already been searched.
+    """
+    _find_project_dir.cache_clear()
+
+
 def get_default_detections() -> Dict[str, Dict[str, List[str]]]:
     """
     Get default language detection rules.
@@ -350,6 +381,106 @@ def get_default_detections() -> Dict[str, Dict[str, List[str]]]:
     }
 
 
+def load_detections(detections_file: Path) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Load language detection rules from a detections file.
+
+    The parsed rules are cached for as long as the file is unchanged, and must
+    not be modified by callers.
+
+    Args:
+        detections_file: Path to the detections YAML file
+
+    Returns:
+        Dict: The detection rules, or the defaults if the file is missing or
+            can't be parsed
+    """
+    try:
+        stat = detections_file.stat()
+    except OSError:
+        return get_default_detections()
+
+    return _parse_detections(str(detections_file), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_detections(
+    path: str, mtime_ns: int, size: int
+) -> Dict[str, Dict[str, List[str]]]:
+    """Parse a detections file; mtime_ns and size key the cache on its version."""
+    try:
+        with open(path, "r") as f:
+            return yaml.load(f, Loader=_YAML_LOADER)
+    except (yaml.YAMLError, IOError) as e:
+        logger.warning(f"Error loading detections file: {e}")
+        return get_default_detections()
+
+
+def _scan_project(
+    project_dir: Path,
+) -> Tuple[List[Tuple[str, str, bool, Tuple[str, ...]]], List[Tuple[str, ...]]]:
+    """
+    Walk a project directory once, without following symlinked directories.
+
+    Uses os.scandir, so file types come from the directory listing rather than
+    a stat of every entry.
+
+    Args:
+        project_dir: The directory to walk
+
+    Returns:
+        Tuple: The (name, path, is_file, parts) of every entry below
+            project_dir, where parts is its path relative to project_dir, and
+            the relative path parts of every directory
+    """
+    entries = []
+    dir_parts = []
+    pending = [(os.fspath(project_dir), ())]
+
+    while pending:
+        directory, parts = pending.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    entry_parts = parts + (entry.name,)
+                    try:
+                        is_dir = entry.is_dir()
+                        entries.append(
+                            (entry.name, entry.path, entry.is_file(), entry_parts)
+                        )
+                    except OSError:
+                        continue
+
+                    if is_dir:
+                        dir_parts.append(entry_parts)
+                        if not entry.is_symlink():
+                            pending.append((entry.path, entry_parts))
+        except OSError as e:
+            logger.debug(f"Error scanning directory {directory}: {e}")
+
+    return entries, dir_parts
+
+
+@functools.lru_cache(maxsize=8)
+def _compile_name_patterns(patterns: Tuple[str, ...]) -> Pattern[str]:
+    """Compile file name patterns into one regex that matches any of them."""
+    if not patterns:
+        # Matches nothing
+        return re.compile(r"(?!)")
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+def _match_trailing_parts(parts: Tuple[str, ...], pattern_parts: List[str]) -> bool:
+    """Check whether the last path parts match a pattern like "src/main/java"."""
+    if len(parts) < len(pattern_parts):
+        return False
+    trailing = parts[len(parts) - len(pattern_parts) :]
+    return all(
+        fnmatch.fnmatchcase(part, pattern)
+        for part, pattern in zip(trailing, pattern_parts)
+    )
+
+
 def detect_language(
     project_dir: Optional[Path] = None, sample_files_limit: int = 10
 ) -> Optional[str]:
@@ -373,15 +504,7 @@ def detect_language(
     config_dir = get_config_dir()
     detections_file = config_dir / "detections.yaml"
 
-    if detections_file.exists():
-        try:
-            with open(detections_file, "r") as f:
-                detections = yaml.safe_load(f)
-        except (yaml.YAMLError, IOError) as e:
-            logger.warning(f"Error loading detections file: {e}")
-            detections = get_default_detections()
-    else:
-        detections = get_default_detections()
+    detections = load_detections(detections_file)
 
     # Count matches for each language
     language_scores = {lang: 0.0 for lang in detections.keys()}
@@ -389,6 +512,24 @@ def detect_language(
     # Files to sample for content pattern matching
     sample_files = []
 
+    # Walk the project once, and match every pattern against the results
+    entries, dir_parts = _scan_project(project_dir)
+
+    # Most entries match no file name pattern at all, so drop those with one
+    # regex before matching the remaining names pattern by pattern. Patterns
+    # with a "/" are matched against relative paths instead.
+    any_file_pattern = _compile_name_patterns(
+        tuple(
+            pattern
+            for rules in detections.values()
+            for pattern in rules.get("file_patterns", [])
+            if isinstance(pattern, str) and "/" not in pattern
+        )
+    )
+    candidates = [
+        (name, path) for name, path, _, _ in entries if any_file_pattern.match(name)
+    ]
+
     # Check file patterns and collect sample files
     for lang, rules in detections.items():
         file_patterns = rules.get("file_patterns", [])
@@ -398,7 +539,19 @@ def detect_language(
         # Check file patterns
         for pattern in file_patterns:
             try:
-                matches = list(project_dir.glob(f"**/{pattern}"))
+                if "/" in pattern:
+                    pattern_parts = pattern.strip("/").split("/")
+                    matches = [
+                        path
+                        for _, path, _, parts in entries
+                        if _match_trailing_parts(parts, pattern_parts)
+                    ]
+                else:
+                    matches = [
+                        path
+                        for name, path in candidates
+                        if fnmatch.fnmatchcase(name, pattern)
+                    ]
                 language_scores[lang] += len(matches) * weight
                 # Collect sample files for content matching
                 sample_files.extend(
@@ -410,7 +563,12 @@ def detect_language(
         # Check directory patterns
         for pattern in dir_patterns:
             try:
-                matches = list(project_dir.glob(f"**/{pattern}/"))
+                pattern_parts = pattern.strip("/").split("/")
+                matches = [
+                    parts
+                    for parts in dir_parts
+                    if _match_trailing_parts(parts, pattern_parts)
+                ]
                 language_scores[lang] += (
                     len(matches) * 3 * weight
                 )  # Weight directories more heavily
@@ -419,9 +577,9 @@ def detect_language(
 
         # Sample some files for content pattern matching - include all files
         # if no direct pattern matches
-    if not sample_files and list(project_dir.glob("**/*")):
-        for file_path in project_dir.glob("**/*"):
-            if file_path.is_file() and file_path.suffix in [
+    if not sample_files:
+        for name, path, is_file, _ in entries:
+            if is_file and os.path.splitext(name)[1] in [
                 ".txt",
                 ".md",
                 ".html",
@@ -437,7 +595,7 @@ def detect_language(
                 ".ts",
                 ".rs",
             ]:
-                sample_files.append(file_path)
+                sample_files.append(path)
                 if len(sample_files) >= sample_files_limit:
                     break
 
@@ -445,7 +603,7 @@ def detect_language(
 
     # Check content patterns in the sampled files
     for file_path in sample_files:
-        if not file_path.is_file():
+        if not os.path.isfile(file_path):
             continue
 
         try:
@@ -5,6 +5,7 @@ This module provides diagnostic tools for analyzing and visualizing fragment res
 """
 
 import logging
+import sys
 import time
 from dataclasses import dataclass, field
 from io import StringIO
@@ -18,8 +19,12 @@ from rich.tree import Tree
 
 logger = logging.getLogger(__name__)
 
+# Keyword arguments for dataclasses created in bulk. Slots drop the per-object
+# __dict__, but dataclass(slots=True) needs Python 3.10.
+DATACLASS_SLOTS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**DATACLASS_SLOTS)
 class DiagnosticEvent:
     """An event captured during diagnostic mode."""
 
@@ -41,7 +46,7 @@ class DiagnosticEvent:
         return "N/A"
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class FragmentResolutionNode:
     """A node in the fragment resolution tree."""
 
@@ -5,6 +5,7 @@ with colorized console help display.
 """
 
 import os
+import shutil
 import subprocess
 import sys
 from pathlib import Path
@@ -41,15 +42,9 @@ def find_editor() -> str:
     # Check for common editors
     common_editors = ["nano", "vim", "emacs", "vi"]
     for editor in common_editors:
-        try:
-            # Check if the editor is in the PATH
-            result = subprocess.run(
-                ["which", editor], capture_output=True, text=True, check=False
-            )
-            if result.returncode == 0:
-                return editor
-        except FileNotFoundError:
-            continue
+        # Check if the editor is in the PATH
+        if shutil.which(editor):
+            return editor
 
     # Fall back to nano or vi, which are likely to be installed
     return "nano"
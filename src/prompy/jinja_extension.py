@@ -4,15 +4,19 @@ Module for Jinja2 extension to support Prompy's fragment inclusion syntax.
 
 import re
 import time
-from typing import Any
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Set
 
 from jinja2 import Environment, Template
 from jinja2.ext import Extension
+from jinja2.utils import LRUCache
 
 from prompy.error_handling import CyclicReferenceError, MissingArgumentError
 
-from .diagnostics import FragmentResolutionNode, diagnostics_manager
+from .diagnostics import DATACLASS_SLOTS, FragmentResolutionNode, diagnostics_manager
 from .prompt_context import PromptContext
+from .prompt_file import PromptFile
 
 # Pre-compile regular expressions for better performance
 EXPR_PATTERN = re.compile(r"{{(.*?)}}", re.DOTALL)
@@ -22,6 +26,38 @@ ARG_PATTERN = re.compile(
 )
 
 
+@dataclass(**DATACLASS_SLOTS)
+class RenderState:
+    """
+    The state of a render in progress, shared by all fragments it includes.
+
+    Attributes:
+        context: The prompt context for resolving fragments
+        fragment_stack: Slugs of the fragments currently being rendered, used
+            to detect cycles
+        resolution_node: The resolution tree node new fragments attach to
+        resolution_tracking: Whether to build the resolution tree
+        referenced_slugs: All slugs referenced so far, for diagnostics
+        loaded_fragments: Fragment files loaded so far, by slug, so a fragment
+            referenced several times is only read and parsed once per render
+        rendered_fragments: Rendered fragment output, keyed by slug and
+            arguments, so each distinct fragment call is rendered only once
+    """
+
+    context: Optional[PromptContext]
+    fragment_stack: List[str]
+    resolution_node: Optional[FragmentResolutionNode] = None
+    resolution_tracking: bool = True
+    referenced_slugs: Set[str] = field(default_factory=set)
+    loaded_fragments: Dict[str, PromptFile] = field(default_factory=dict)
+    rendered_fragments: Dict[Hashable, str] = field(default_factory=dict)
+
+
+# The state of the render in progress. A ContextVar keeps concurrent renders
+# on the shared environment apart without touching its globals.
+render_state: ContextVar[RenderState] = ContextVar("prompy_render_state")
+
+
 def preprocess_template(source: str) -> str:
     """
     Preprocess a template string to transform @slug references.
@@ -207,26 +243,27 @@ class PrompyExtension(Extension):
         # Register our include_fragment function as a global function
         environment.globals["include_fragment"] = self.include_fragment
 
-        # Initialize template cache for better performance
-        # Use WeakKeyDictionary to allow garbage collection of unused templates
-        from weakref import WeakKeyDictionary
-
-        self._template_cache = WeakKeyDictionary()
+        # Bounded cache of compiled fragment templates, keyed by template
+        # source so it hits even when a fragment file is loaded again
+        self._template_cache = LRUCache(256)
 
-    def _get_cached_template(self, fragment_file) -> Template:
+    def compile_template(self, source: str) -> Template:
         """
-        Get a cached template instance or create a new one.
+        Get a compiled template for the source from the cache, or compile it.
+
+        Root prompts and fragments share this cache, so a prompt that is both
+        rendered directly and included elsewhere is only compiled once.
 
         Args:
-            fragment_file: The prompt file to create a template for
+            source: The template source
 
         Returns:
             Template: A Jinja2 template instance
         """
-        template = self._template_cache.get(fragment_file)
+        template = self._template_cache.get(source)
         if template is None:
-            template = self.environment.from_string(fragment_file.markdown_template)
-            self._template_cache[fragment_file] = template
+            template = self.environment.from_string(source)
+            self._template_cache[source] = template
         return template
 
     def preprocess(self, source, name, filename=None):
@@ -240,6 +277,10 @@ class PrompyExtension(Extension):
         """
         Include a fragment by slug with improved caching.
 
+        Per-render state (the prompt context, fragment stack and resolution
+        node) is read from the current RenderState, so concurrent renders on
+        one environment don't interfere.
+
         Args:
             __slug: The fragment slug
             *args: Positional arguments for the fragment
@@ -247,152 +288,228 @@ class PrompyExtension(Extension):
 
         Returns:
             The rendered fragment content
+
+        Raises:
+            RuntimeError: If no render is in progress
         """
-        # Start timing for diagnostics
-        start_time = time.time() if hasattr(time, "time") else None
-
-        # Add diagnostic event
-        diagnostics_manager.add_event(
-            "fragment_include_start",
-            slug=__slug,
-            args=args,
-            kwargs={k: v for k, v in kwargs.items() if k != "indent"},
-        )
+        state = render_state.get(None)
+        if state is None:
+            raise RuntimeError(
+                f"Cannot include @{__slug}: no render in progress. Templates "
+                "are rendered with PromptRender.render, which sets render_state."
+            )
+        return self._include_fragment(state, __slug, args, kwargs)
+
+    def _include_fragment(
+        self, state: RenderState, slug: str, args: tuple, kwargs: dict
+    ) -> str:
+        """
+        Include a fragment by slug using the given render state.
+
+        Args:
+            state: The state of the render in progress
+            slug: The fragment slug
+            args: Positional arguments for the fragment
+            kwargs: Keyword arguments for the fragment
+
+        Returns:
+            The rendered fragment content
+        """
+        # Timing and events are only collected when diagnostics are enabled
+        diagnostics = diagnostics_manager.enabled
+        if diagnostics:
+            start_time = time.perf_counter()
+            diagnostics_manager.add_event(
+                "fragment_include_start",
+                slug=slug,
+                args=args,
+                kwargs={k: v for k, v in kwargs.items() if k != "indent"},
+            )
+
+        # Get fragment stack to track fragment inclusion
+        fragment_stack = state.fragment_stack
 
         # Create resolution node for this fragment
-        parent_node = self.environment.globals.get("_resolution_node")
+        parent_node = state.resolution_node
         current_node = None
 
-        if parent_node and self.environment.globals.get("_resolution_tracking", False):
+        if parent_node and state.resolution_tracking:
             current_node = FragmentResolutionNode(
-                slug=__slug,
-                depth=len(self.environment.globals.get("_fragment_stack", [])),
+                slug=slug,
+                depth=len(fragment_stack),
                 arguments={k: v for k, v in kwargs.items() if k != "indent"},
             )
             parent_node.children.append(current_node)
 
-            # Temporarily make this node the current node for nested fragments
-            self.environment.globals["_resolution_node"] = current_node
-
         # Extract indent from kwargs if present
         indent_prefix = kwargs.pop("indent", "")
 
-        # Get context from environment globals
-        context = self.environment.globals.get("_prompy_context")
+        # Get the prompy context for loading fragments
+        context = state.context
         if not context:
             error_msg = "Prompy context not available in Jinja2 environment"
             if current_node:
                 current_node.error = error_msg
             raise ValueError(error_msg)
 
-        # Get fragment stack from globals to track fragment inclusion
-        fragment_stack = self.environment.globals.get("_fragment_stack", [])
-
         # Detect cycles
-        if __slug in fragment_stack:
-            cycle_path = fragment_stack + [__slug]
+        if slug in fragment_stack:
+            cycle_path = fragment_stack + [slug]
             cycle_path_str = " -> ".join(cycle_path)
             error_msg = f"Cyclic reference detected: {cycle_path_str}"
             if current_node:
                 current_node.error = error_msg
             diagnostics_manager.add_event(
                 "fragment_cycle_detected",
-                slug=__slug,
+                slug=slug,
                 cycle_path=cycle_path,
             )
-            raise CyclicReferenceError(start_file=__slug, cycle_path=cycle_path)
+            raise CyclicReferenceError(start_file=slug, cycle_path=cycle_path)
 
         try:
             # Load the referenced fragment
-            fragment_load_start = time.time() if hasattr(time, "time") else None
-            fragment_file = context.load_slug(__slug)
-            fragment_load_time = (
-                time.time() - fragment_load_start if fragment_load_start else None
-            )
-
-            diagnostics_manager.add_event(
-                "fragment_loaded", slug=__slug, duration=fragment_load_time
-            )
-
-            # Update the fragment stack to track the inclusion
-            new_stack = fragment_stack + [__slug]
-
-            # Save the original stack
-            original_stack = self.environment.globals.get("_fragment_stack", [])
-
-            # Update the stack in the environment
-            self.environment.globals["_fragment_stack"] = new_stack
+            if diagnostics:
+                step_start = time.perf_counter()
+            fragment_file = state.loaded_fragments.get(slug)
+            if fragment_file is None:
+                fragment_file = context.load_slug(slug)
+                state.loaded_fragments[slug] = fragment_file
+            if diagnostics:
+                diagnostics_manager.add_event(
+                    "fragment_loaded",
+                    slug=slug,
+                    duration=time.perf_counter() - step_start,
+                )
 
             # Track this slug in the set of referenced slugs for diagnostics
-            if "_referenced_slugs" in self.environment.globals:
-                self.environment.globals["_referenced_slugs"].add(__slug)
+            state.referenced_slugs.add(slug)
+
+            # A fragment called again with the same arguments renders the same
+            # text, so reuse it rather than rendering the subtree again. When
+            # the resolution tree is tracked, every call is rendered so each
+            # one records its own nested fragments.
+            render_key = (
+                None
+                if state.resolution_tracking
+                else self._render_key(slug, args, kwargs)
+            )
+            result = (
+                state.rendered_fragments.get(render_key)
+                if render_key is not None
+                else None
+            )
+            if result is not None:
+                if diagnostics:
+                    diagnostics_manager.add_event("fragment_reused", slug=slug)
+                return self._indent_result(result, indent_prefix)
 
             # Get or create template instance from cache
-            template_start = time.time() if hasattr(time, "time") else None
-            fragment_template = self._get_cached_template(fragment_file)
-            template_time = time.time() - template_start if template_start else None
-
-            diagnostics_manager.add_event(
-                "fragment_template_created", slug=__slug, duration=template_time
-            )
+            if diagnostics:
+                step_start = time.perf_counter()
+            fragment_template = self.compile_template(fragment_file.markdown_template)
+            if diagnostics:
+                diagnostics_manager.add_event(
+                    "fragment_template_created",
+                    slug=slug,
+                    duration=time.perf_counter() - step_start,
+                )
 
             # Create variable context for rendering
-            context_start = time.time() if hasattr(time, "time") else None
+            if diagnostics:
+                step_start = time.perf_counter()
             vars_context = self._prepare_template_context(fragment_file, args, kwargs)
-            context_time = time.time() - context_start if context_start else None
-
-            diagnostics_manager.add_event(
-                "fragment_context_prepared",
-                slug=__slug,
-                duration=context_time,
-                context_size=len(vars_context),
-            )
-
-            # Render the fragment with the context
-            render_start = time.time() if hasattr(time, "time") else None
-            result = fragment_template.render(vars_context)
-            render_time = time.time() - render_start if render_start else None
-
-            diagnostics_manager.add_event(
-                "fragment_rendered",
-                slug=__slug,
-                duration=render_time,
-                result_length=len(result),
-            )
-
-            # Apply indentation if needed and if there's content with multiple lines
-            if indent_prefix and "\n" in result:
-                result = self.environment.filters["indent"](
-                    result, first=False, width=len(indent_prefix)
+            if diagnostics:
+                diagnostics_manager.add_event(
+                    "fragment_context_prepared",
+                    slug=slug,
+                    duration=time.perf_counter() - step_start,
+                    context_size=len(vars_context),
                 )
 
-            # Restore the original stack
-            self.environment.globals["_fragment_stack"] = original_stack
-
-            # If we're tracking resolution, update the duration and restore
-            # the parent node
+            # Push this fragment onto the stack, as the parent for nested
+            # fragments, while it renders
+            fragment_stack.append(slug)
             if current_node:
-                current_node.duration = (
-                    time.time() - start_time if start_time else 0.001
+                state.resolution_node = current_node
+            try:
+                # Render the fragment with the context
+                if diagnostics:
+                    step_start = time.perf_counter()
+                result = fragment_template.render(vars_context)
+            finally:
+                fragment_stack.pop()
+                state.resolution_node = parent_node
+
+            if render_key is not None:
+                state.rendered_fragments[render_key] = result
+
+            if diagnostics:
+                diagnostics_manager.add_event(
+                    "fragment_rendered",
+                    slug=slug,
+                    duration=time.perf_counter() - step_start,
+                    result_length=len(result),
                 )
-                # Restore parent node
-                if parent_node:
-                    self.environment.globals["_resolution_node"] = parent_node
 
-            diagnostics_manager.add_event(
-                "fragment_include_end",
-                slug=__slug,
-                duration=time.time() - start_time if start_time else None,
-            )
+            result = self._indent_result(result, indent_prefix)
+
+            if diagnostics:
+                duration = time.perf_counter() - start_time
+                # If we're tracking resolution, update the duration
+                if current_node:
+                    current_node.duration = duration
+                diagnostics_manager.add_event(
+                    "fragment_include_end", slug=slug, duration=duration
+                )
 
             return result
 
         except FileNotFoundError:
-            raise ValueError(f"Missing fragment: @{__slug}")
-        except Exception:
-            # Ensure we restore the stack even if there's an error
-            self.environment.globals["_fragment_stack"] = fragment_stack
-            raise
+            raise ValueError(f"Missing fragment: @{slug}")
+
+    @staticmethod
+    def _render_key(slug: str, args: tuple, kwargs: dict) -> Optional[Hashable]:
+        """
+        Build the key identifying a fragment call in the rendered output cache.
+
+        Args:
+            slug: The fragment slug
+            args: Positional arguments for the fragment
+            kwargs: Keyword arguments for the fragment, without the indent
+
+        Returns:
+            The cache key, or None if an argument value is unhashable
+        """
+        # Values that compare equal across types (1, 1.0, True) render
+        # differently, so each value is keyed together with its type
+        key = (
+            slug,
+            tuple((type(value), value) for value in args),
+            frozenset((name, type(value), value) for name, value in kwargs.items()),
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _indent_result(self, result: str, indent_prefix: str) -> str:
+        """
+        Indent continuation lines of a rendered fragment.
+
+        Args:
+            result: The rendered fragment content
+            indent_prefix: The indentation of the line the reference is on
+
+        Returns:
+            str: The content with every line after the first indented
+        """
+        # Apply indentation if needed and if there's content with multiple lines
+        if indent_prefix and "\n" in result:
+            result = self.environment.filters["indent"](
+                result, first=False, width=len(indent_prefix)
+            )
+        return result
 
     def _prepare_template_context(self, fragment_file, args, kwargs) -> dict:
         """
@@ -406,36 +523,35 @@ class PrompyExtension(Extension):
         Returns:
             dict: The template context with variables
         """
-        vars_context = {}
-        vars_context.update(kwargs)
+        vars_context = dict(kwargs)
 
-        if fragment_file.arguments:
-            # Apply positional arguments if fragment has argument definitions
-            arg_names = list(fragment_file.arguments.keys())
-            for i, arg_value in enumerate(args):
-                if i < len(arg_names):
-                    vars_context[arg_names[i]] = arg_value
+        arguments = fragment_file.arguments
+        if arguments:
+            # Apply positional arguments in declaration order; zip stops at
+            # whichever of the names or values runs out first
+            vars_context.update(zip(arguments, args))
 
             # Apply default arguments for any missing arguments
-            for arg_name, default_value in fragment_file.arguments.items():
-                if arg_name not in vars_context and default_value is not None:
-                    vars_context[arg_name] = default_value
-                elif arg_name not in vars_context and default_value is None:
+            for arg_name, default_value in arguments.items():
+                if arg_name in vars_context:
+                    continue
+                if default_value is None:
                     # Required argument is missing
                     raise MissingArgumentError(
                         argument_name=arg_name,
                         fragment_slug=fragment_file.slug,
                     )
+                vars_context[arg_name] = default_value
 
         return vars_context
 
 
-def create_jinja_environment(context: PromptContext) -> Environment:
+def create_jinja_environment() -> Environment:
     """
     Create a Jinja2 environment configured for Prompy.
 
-    Args:
-        context: The Prompy context for resolving fragments
+    The environment holds no per-render state; each render sets its own
+    RenderState in render_state.
 
     Returns:
         Environment: A configured Jinja2 environment
@@ -445,10 +561,10 @@ def create_jinja_environment(context: PromptContext) -> Environment:
         autoescape=False,  # No HTML escaping for markdown
         trim_blocks=True,
         lstrip_blocks=True,
+        # Templates are compiled with from_string and cached by the extension,
+        # never through a loader, so there are no sources to stat for changes
+        auto_reload=False,
+        optimized=True,
     )
 
-    # Add the Prompy context to the global environment
-    env.globals["_prompy_context"] = context
-    env.globals["_fragment_stack"] = []
-
     return env
@@ -4,10 +4,13 @@ Module for handling prompt files and their representation.
 
 import re
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 import yaml
 
+# Frontmatter is the YAML between leading --- markers; group 2 is the body
+FRONTMATTER_PATTERN = re.compile(r"^---\s*\n(.*?)\n---\s*\n(.*)", re.DOTALL)
+
 
 # Configure PyYAML to use literal style for strings containing special characters
 def _literal_str_representer(dumper, data):
@@ -57,6 +60,7 @@ class PromptFile:
         self.arguments: Optional[Dict[str, Optional[str]]] = arguments
         self.frontmatter: str = frontmatter
         self.markdown_template: str = markdown_template
+        self._stripped_template_cache: Optional[Tuple[str, str]] = None
 
     @staticmethod
     def parse_frontmatter(content: str) -> Tuple[Dict[str, Any], str, str]:
@@ -71,9 +75,7 @@ class PromptFile:
                 string, and content string
         """
         # Check for frontmatter (content between --- markers)
-        frontmatter_match = re.match(
-            r"^---\s*\n(.*?)\n---\s*\n(.*)", content, re.DOTALL
-        )
+        frontmatter_match = FRONTMATTER_PATTERN.match(content)
         if not frontmatter_match:
             # No frontmatter, return empty dict and the original content
             return {}, "", content
@@ -144,6 +146,38 @@ class PromptFile:
 
         return prompt_file
 
+    @property
+    def category_set(self) -> FrozenSet[str]:
+        """
+        The prompt's categories as a frozenset, for O(1) membership tests.
+
+        The set is built on each access, so it follows changes made to the
+        `categories` list in place.
+
+        Returns:
+            FrozenSet[str]: The categories, or an empty set if there are none
+        """
+        return frozenset(self.categories or ())
+
+    @property
+    def stripped_template(self) -> str:
+        """
+        The markdown template without surrounding whitespace, as rendered for
+        a root prompt.
+
+        The stripped copy is cached and rebuilt whenever `markdown_template`
+        is reassigned. Fragments render `markdown_template` unstripped.
+
+        Returns:
+            str: The stripped markdown template
+        """
+        template = self.markdown_template
+        cached = self._stripped_template_cache
+        if cached is None or cached[0] is not template:
+            cached = (template, template.strip())
+            self._stripped_template_cache = cached
+        return cached[1]
+
     @property
     def rendered_frontmatter(self) -> str:
         """
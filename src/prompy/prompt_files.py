@@ -3,7 +3,10 @@ Module for managing collections of prompt files.
 """
 
 import logging
-from typing import Dict, List, Optional
+from io import StringIO
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
 from rich.console import Console
 from rich.panel import Panel
@@ -15,6 +18,8 @@ from prompy.prompt_file import PromptFile
 logger = logging.getLogger(__name__)
 console = Console()
 
+_NO_PROMPTS: Mapping[str, PromptFile] = MappingProxyType({})
+
 
 class PromptFiles:
     """
@@ -25,19 +30,41 @@ class PromptFiles:
         self,
         project_name: Optional[str] = None,
         language_name: Optional[str] = None,
-        languages: Dict[str, PromptFile] = {},
-        projects: Dict[str, PromptFile] = {},
-        fragments: Dict[str, PromptFile] = {},
+        languages: Optional[Mapping[str, PromptFile]] = None,
+        projects: Optional[Mapping[str, PromptFile]] = None,
+        fragments: Optional[Mapping[str, PromptFile]] = None,
     ) -> None:
         """
-        Initialize an empty collection of prompt files.
+        Initialize a collection of prompt files.
+
+        Args:
+            project_name: Optional name of the current project
+            language_name: Optional name of the detected language
+            languages: Language prompts by slug
+            projects: Project prompts by slug
+            fragments: Fragment prompts by slug
         """
         self._project_name = project_name
         self._language_name = language_name
 
-        self._fragment_prompts: Dict[str, PromptFile] = fragments
-        self._project_prompts: Dict[str, PromptFile] = projects
-        self._language_prompts: Dict[str, PromptFile] = languages
+        # Missing categories share one read-only empty mapping
+        self._fragment_prompts: Mapping[str, PromptFile] = (
+            fragments if fragments is not None else _NO_PROMPTS
+        )
+        self._project_prompts: Mapping[str, PromptFile] = (
+            projects if projects is not None else _NO_PROMPTS
+        )
+        self._language_prompts: Mapping[str, PromptFile] = (
+            languages if languages is not None else _NO_PROMPTS
+        )
+
+        # A single slug index for lookups, with precedence
+        # project > language > fragment.
+        self._by_slug: Dict[str, PromptFile] = {
+            **self._fragment_prompts,
+            **self._language_prompts,
+            **self._project_prompts,
+        }
 
     def get_file(self, slug: str) -> Optional[PromptFile]:
         """
@@ -49,33 +76,22 @@ class PromptFiles:
         Returns:
             Optional[PromptFile]: The prompt file, or None if not found
         """
-        if slug.startswith("project"):
-            return self._project_prompts.get(slug)
-        elif slug.startswith("language") or slug.startswith("$env"):
-            return self._language_prompts.get(slug)
-        else:
-            return self._fragment_prompts.get(slug)
+        return self._by_slug.get(slug)
 
     def get_prompt_file(self, slug: str) -> Optional[PromptFile]:
         """
         Get a prompt file by its slug.
 
+        Project prompts take precedence over language prompts, which take
+        precedence over fragment prompts.
+
         Args:
             slug: The slug of the prompt file.
 
         Returns:
             PromptFile if found, None otherwise.
         """
-        # Check project prompts first
-        if slug in self._project_prompts:
-            return self._project_prompts[slug]
-        # Then language prompts
-        if slug in self._language_prompts:
-            return self._language_prompts[slug]
-        # Finally fragment prompts
-        if slug in self._fragment_prompts:
-            return self._fragment_prompts[slug]
-        return None
+        return self._by_slug.get(slug)
 
     def available_slugs(self) -> List[str]:
         """
@@ -84,11 +100,12 @@ class PromptFiles:
         Returns:
             List[str]: List of available slugs
         """
-        return (
-            list(self._project_prompts.keys())
-            + list(self._language_prompts.keys())
-            + list(self._fragment_prompts.keys())
-        )
+        # Unpack straight into one list rather than concatenating temporaries
+        return [
+            *self._project_prompts,
+            *self._language_prompts,
+            *self._fragment_prompts,
+        ]
 
     def help_text(
         self,
@@ -99,6 +116,7 @@ class PromptFiles:
         use_dashes: bool = True,
         inline_description: bool = False,
         category_filter: Optional[str] = None,
+        color: bool = True,
     ) -> str:
         """
         Generate formatted help text for available prompts.
@@ -110,15 +128,16 @@ class PromptFiles:
             use_dashes: Whether to use dashed lines for sections
             inline_description: Whether to include descriptions inline
             category_filter: Optional category to filter prompts by
+            color: Whether to include ANSI styling. Pass False when the text
+                is headed for a pipe or file, to skip generating escape codes
+                that would only be stripped again.
 
         Returns:
             str: Formatted help text
         """
         # Create string buffer for rich output
-        from io import StringIO
-
         output = StringIO()
-        temp_console = Console(file=output, force_terminal=True)
+        temp_console = Console(file=output, force_terminal=color, no_color=not color)
 
         # Use the render_help_to_console method to avoid code duplication
         self.render_help_to_console(
@@ -158,20 +177,17 @@ class PromptFiles:
         other_files = []
 
         # Identify task files from fragment prompts
-        for slug, prompt_file in self._fragment_prompts.items():
-            # Skip if category filter is active and doesn't match
-            if category_filter and (
-                not prompt_file.categories
-                or category_filter not in prompt_file.categories
-            ):
-                continue
-
+        for slug, prompt_file in self._filter_by_category(
+            self._fragment_prompts.items(), category_filter
+        ):
             if not prompt_file.is_fragment():
                 task_files.append((slug, prompt_file))
             else:
                 other_files.append((slug, prompt_file))
 
-        # Define sections to display
+        # Define sections to display. Items are filtered by category before
+        # sorting, and sorted by slug alone; slugs are unique within a section.
+        by_slug = itemgetter(0)
         sections = [
             {
                 "title": (
@@ -179,10 +195,11 @@ class PromptFiles:
                     f"{f'({self._project_name})' if self._project_name else ''}"
                 ),
                 "style": "blue",
-                "items": (
-                    sorted(self._project_prompts.items())
-                    if self._project_prompts
-                    else []
+                "items": sorted(
+                    self._filter_by_category(
+                        self._project_prompts.items(), category_filter
+                    ),
+                    key=by_slug,
                 ),
             },
             {
@@ -191,21 +208,22 @@ class PromptFiles:
                     f"{f'({self._language_name})' if self._language_name else ''}"
                 ),
                 "style": "blue",
-                "items": (
-                    sorted(self._language_prompts.items())
-                    if self._language_prompts
-                    else []
+                "items": sorted(
+                    self._filter_by_category(
+                        self._language_prompts.items(), category_filter
+                    ),
+                    key=by_slug,
                 ),
             },
             {
                 "title": "Tasks",
                 "style": "blue",
-                "items": sorted(task_files) if task_files else [],
+                "items": sorted(task_files, key=by_slug),
             },
             {
                 "title": "Fragments",
                 "style": "blue",
-                "items": sorted(other_files) if other_files else [],
+                "items": sorted(other_files, key=by_slug),
             },
         ]
 
@@ -217,17 +235,6 @@ class PromptFiles:
         # Add each section
         for section in sections:
             items = section["items"]
-            if not items:
-                continue
-
-            # Filter items by category if specified
-            if category_filter:
-                items = [
-                    (slug, pf)
-                    for slug, pf in items
-                    if pf.categories and category_filter in pf.categories
-                ]
-
             if not items:  # Skip empty sections after filtering
                 continue
 
@@ -243,37 +250,24 @@ class PromptFiles:
                 collapse_padding=True,
             )
 
-            # Columns depend on display mode
+            # Columns and rows depend on display mode; the mode check is hoisted
+            # out of the row loops
+            table.add_column("Prompt", style="bright_white")
+            table.add_column("Description", style="bright_black")
             if inline_description:
-                table.add_column("Prompt", style="bright_white")
-                table.add_column("Description", style="bright_black")
                 table.add_column("Categories", style="dim")
-            else:
-                table.add_column("Prompt", style="bright_white")
-                if not inline_description:
-                    table.add_column("Description", style="bright_black")
-
-            # Add items to table
-            for slug, prompt_file in items:
-                args_str = self._format_arguments(prompt_file.arguments)
-                prompt_text = f"{slug_prefix}{slug}{args_str}"
-
-                if inline_description:
-                    categories = (
-                        ", ".join(prompt_file.categories)
-                        if prompt_file.categories
-                        else ""
+                for slug, prompt_file in items:
+                    table.add_row(
+                        self._format_prompt_text(slug_prefix, slug, prompt_file),
+                        prompt_file.description or "",
+                        ", ".join(prompt_file.categories or ()),
                     )
+            else:
+                for slug, prompt_file in items:
                     table.add_row(
-                        prompt_text,
+                        self._format_prompt_text(slug_prefix, slug, prompt_file),
                         prompt_file.description or "",
-                        categories,
                     )
-                else:
-                    if prompt_file.description:
-                        table.add_row(prompt_text, prompt_file.description)
-                    else:
-                        table.add_row(prompt_text)
 
             # Create and print panel containing the table
             panel = Panel(table, title=title, style="blue")
@@ -300,6 +294,44 @@ class PromptFiles:
             )
             target_console.print(syntax_panel)
 
+    @staticmethod
+    def _filter_by_category(
+        items: Iterable[Tuple[str, PromptFile]], category_filter: Optional[str]
+    ) -> Iterator[Tuple[str, PromptFile]]:
+        """
+        Lazily filter (slug, prompt file) pairs by category.
+
+        Args:
+            items: The (slug, prompt file) pairs to filter
+            category_filter: The category to keep, or None to keep everything
+
+        Returns:
+            Iterator[Tuple[str, PromptFile]]: The matching pairs
+        """
+        if not category_filter:
+            return iter(items)
+        return (
+            (slug, prompt_file)
+            for slug, prompt_file in items
+            if category_filter in prompt_file.category_set
+        )
+
+    def _format_prompt_text(
+        self, slug_prefix: str, slug: str, prompt_file: PromptFile
+    ) -> str:
+        """
+        Format a prompt's slug and arguments for display in help text.
+
+        Args:
+            slug_prefix: Prefix to add to the slug
+            slug: The prompt slug
+            prompt_file: The prompt file, for its arguments
+
+        Returns:
+            str: Formatted prompt text
+        """
+        return f"{slug_prefix}{slug}{self._format_arguments(prompt_file.arguments)}"
+
     def _format_arguments(self, args: Optional[Dict[str, Optional[str]]]) -> str:
         """
         Format arguments for display in help text.
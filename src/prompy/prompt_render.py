@@ -3,36 +3,29 @@ Module for rendering prompt templates with fragment resolution using Jinja2.
 """
 
 import time
-from dataclasses import dataclass
-from functools import lru_cache
-from typing import Dict, Optional
+from typing import Set
 
 from jinja2 import Environment, Template, TemplateSyntaxError
 
 from prompy.error_handling import PrompyTemplateSyntaxError
 
 from .diagnostics import FragmentResolutionNode, diagnostics_manager
-from .jinja_extension import create_jinja_environment
+from .jinja_extension import (
+    PrompyExtension,
+    RenderState,
+    create_jinja_environment,
+    render_state,
+)
 from .prompt_context import PromptContext
 from .prompt_file import PromptFile
 
+# A single Jinja2 environment shared by every renderer. Per-render state is
+# kept in a context variable, so renders never mutate it.
+_ENV = create_jinja_environment()
 
-@dataclass
-class RenderError:
-    """
-    Class representing an error during rendering.
-
-    Attributes:
-        message: Error message
-        position: Position in the source text where the error occurred
-        line: Line number where the error occurred
-        slug: The slug of the prompt file being rendered when the error occurred
-    """
-
-    message: str
-    position: int
-    line: Optional[int] = None
-    slug: Optional[str] = None
+# The extension owns the compiled template cache, shared by prompts and the
+# fragments they include
+_EXTENSION: PrompyExtension = _ENV.extensions[PrompyExtension.identifier]
 
 
 class PromptRender:
@@ -48,54 +41,38 @@ class PromptRender:
             prompt_file: The prompt file to render
         """
         self.prompt_file = prompt_file
-        self._env: Optional[Environment] = None
-        self._template_cache: Dict[str, Template] = {}
 
     @property
     def env(self) -> Environment:
         """
-        Get or create the Jinja2 environment.
+        Get the shared Jinja2 environment.
 
         Returns:
             Environment: The configured Jinja2 environment
         """
-        if self._env is None:
-            self._env = create_jinja_environment(self._get_context())
-        return self._env
+        return _ENV
 
-    @lru_cache(maxsize=128)
-    def _get_context(self) -> PromptContext:
-        """
-        Get or create the prompt context. Results are cached.
-
-        Returns:
-            PromptContext: The prompt context for resolving fragments
-        """
-        return PromptContext()
-
-    def _get_template(self, content: str) -> Template:
+    def _get_template(self, prompt_file: PromptFile) -> Template:
         """
         Get or create a template instance from the cache.
 
         Args:
-            content: The template content
+            prompt_file: The prompt file whose markdown template to compile
 
         Returns:
             Template: The compiled template
         """
-        template = self._template_cache.get(content)
-        if template is None:
-            try:
-                template = self.env.from_string(content)
-                self._template_cache[content] = template
-            except TemplateSyntaxError as e:
-                # Convert Jinja2 syntax error to a more specific error
-                raise PrompyTemplateSyntaxError(
-                    e.message or "Template syntax error",
-                    line_number=e.lineno,
-                    file_path=self.prompt_file.slug,
-                )
-        return template
+        try:
+            # Root prompts render stripped; the stripped copy is cached on the
+            # prompt file rather than rebuilt per render
+            return _EXTENSION.compile_template(prompt_file.stripped_template)
+        except TemplateSyntaxError as e:
+            # Convert Jinja2 syntax error to a more specific error
+            raise PrompyTemplateSyntaxError(
+                e.message or "Template syntax error",
+                line_number=e.lineno,
+                file_path=self.prompt_file.slug,
+            )
 
     def render(self, context: PromptContext) -> str:
         """
@@ -110,53 +87,73 @@ class PromptRender:
         Raises:
             ValueError: If a fragment can't be resolved or there's a cycle
         """
-        diagnostics_manager.start_operation("render", slug=self.prompt_file.slug)
+        slug = self.prompt_file.slug
+        arguments = self.prompt_file.arguments or {}
+
+        # Diagnostics are off for normal runs; skip the timing, events and
+        # resolution tree entirely rather than paying for them per render
+        if not diagnostics_manager.enabled:
+            template = self._get_template(self.prompt_file)
+            state = RenderState(
+                context=context, fragment_stack=[slug], resolution_tracking=False
+            )
+            token = render_state.set(state)
+            try:
+                return template.render(arguments)
+            except Exception as e:
+                # Re-raise ValueError errors (like cyclic references) as they are
+                if isinstance(e, ValueError):
+                    raise
+
+                # Convert other exceptions to a more specific error
+                raise ValueError(f"Error rendering template: {str(e)}") from e
+            finally:
+                render_state.reset(token)
+
+        diagnostics_manager.start_operation("render", slug=slug)
 
         try:
             # Create a root node for the resolution tree
-            resolution_root = FragmentResolutionNode(slug=self.prompt_file.slug)
-            self.env.globals["_resolution_node"] = resolution_root
-            self.env.globals["_resolution_tracking"] = True
-
-            # Add the current prompt file slug to the fragment stack to detect cycles
-            self.env.globals["_fragment_stack"] = [self.prompt_file.slug]
+            resolution_root = FragmentResolutionNode(slug=slug)
 
             # Store a set of all referenced slugs for diagnostics (used for
             # visualization)
-            self.env.globals["_referenced_slugs"] = set()
-
-            # Set the prompt context in the environment
-            self.env.globals["_prompy_context"] = context
-
-            # Get the template content
-            template_content = self.prompt_file.markdown_template.strip()
-            arguments = self.prompt_file.arguments or {}
+            referenced_slugs: Set[str] = set()
 
             diagnostics_manager.add_event(
                 "template_loaded",
-                slug=self.prompt_file.slug,
-                content_length=len(template_content),
+                slug=slug,
+                content_length=len(self.prompt_file.markdown_template),
             )
 
             # Get or create template from cache
-            start_time = time.time()
-            template = self._get_template(template_content)
-            template_compile_time = time.time() - start_time
+            start_time = time.perf_counter()
+            template = self._get_template(self.prompt_file)
+            template_compile_time = time.perf_counter() - start_time
 
             diagnostics_manager.add_event(
-                "template_compiled",
-                slug=self.prompt_file.slug,
-                duration=template_compile_time,
+                "template_compiled", slug=slug, duration=template_compile_time
             )
 
             # Record arguments in the root node
             resolution_root.arguments = arguments.copy()
 
+            # Per-render state lives in a context variable rather than the
+            # shared environment globals. The current prompt file slug starts
+            # the fragment stack, to detect cycles.
+            state = RenderState(
+                context=context,
+                fragment_stack=[slug],
+                resolution_node=resolution_root,
+                referenced_slugs=referenced_slugs,
+            )
+
             # Render the template with the arguments
+            token = render_state.set(state)
             try:
-                start_time = time.time()
+                start_time = time.perf_counter()
                 result = template.render(arguments)
-                render_time = time.time() - start_time
+                render_time = time.perf_counter() - start_time
 
                 # Update resolution node with duration
                 resolution_root.duration = render_time
@@ -166,28 +163,25 @@ class PromptRender:
 
                 diagnostics_manager.add_event(
                     "template_rendered",
-                    slug=self.prompt_file.slug,
+                    slug=slug,
                     duration=render_time,
                     result_length=len(result),
-                    referenced_slugs=list(
-                        self.env.globals.get("_referenced_slugs", set())
-                    ),
+                    referenced_slugs=list(referenced_slugs),
                 )
 
                 return result
-            except ValueError as e:
-                # Mark the error in the resolution node
-                resolution_root.error = str(e)
-                diagnostics_manager.record_fragment_resolution(resolution_root)
-
-                # Re-raise ValueError errors (like cyclic references)
-                raise
             except Exception as e:
                 # Mark the error in the resolution node
                 resolution_root.error = str(e)
                 diagnostics_manager.record_fragment_resolution(resolution_root)
 
+                # Re-raise ValueError errors (like cyclic references) as they are
+                if isinstance(e, ValueError):
+                    raise
+
                 # Convert other exceptions to a more specific error
-                raise ValueError(f"Error rendering template: {str(e)}")
+                raise ValueError(f"Error rendering template: {str(e)}") from e
+            finally:
+                render_state.reset(token)
         finally:
-            diagnostics_manager.end_operation("render", slug=self.prompt_file.slug)
+            diagnostics_manager.end_operation("render", slug=slug)
@@ -2,25 +2,35 @@
 Functions for finding and updating references to fragments in prompt files.
 
 This module implements functions to find and update @slug references in templates.
-Supports both Jinja2-style ({{ @slug }}) and legacy-style (@slug) references.
+References are Jinja2-style expressions, such as {{ @slug }} or {{ @slug(args) }}.
 """
 
 import logging
+import os
 import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Pattern
+from typing import Callable, Dict, List, Mapping, Pattern, Tuple
 
 from .prompt_context import PromptContext
-from .prompt_file import PromptFile
+from .prompt_file import FRONTMATTER_PATTERN
 
 logger = logging.getLogger(__name__)
 
 # Regular expression to find fragment references in Jinja2 template expressions
 # This matches: {{ @slug }} or {{ @slug(args) }}
+# Negated character classes instead of lazy `.*?` groups keep each match
+# inside a single {{ ... }} expression and avoid backtracking.
 JINJA_FRAGMENT_REF_PATTERN: Pattern = re.compile(
-    r"{{(.*?)@([a-zA-Z0-9_\-/$]+)(\(.*?\))?.*?}}"
+    r"\{\{[^@}]*@([a-zA-Z0-9_\-/$]+)(\([^)]*\))?[^}]*\}\}"
 )
 
+# Worker threads for updating files concurrently; the work is I/O bound, so
+# use more threads than cores
+_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
 
 def update_references_in_file(file_path: Path, old_slug: str, new_slug: str) -> bool:
     """
@@ -34,59 +44,65 @@ def update_references_in_file(file_path: Path, old_slug: str, new_slug: str) ->
     Returns:
         bool: True if any changes were made
     """
+    return update_references_in_file_bulk(file_path, {old_slug: new_slug})
+
+
+def update_references_in_file_bulk(file_path: Path, renames: Mapping[str, str]) -> bool:
+    """
+    Update references to several slugs in the specified file in one pass.
+
+    Args:
+        file_path: Path to the file to update
+        renames: Map of old fragment slugs to the new slugs to use
+
+    Returns:
+        bool: True if any changes were made
+    """
+    if not renames:
+        return False
+
     try:
-        # Load the file
-        prompt_file = PromptFile.load(file_path)
-        content = prompt_file.markdown_template
-
-        # Find all references (both Jinja2 and legacy style)
-        matches = []
-
-        # Check for Jinja2-style references
-        for match in re.finditer(JINJA_FRAGMENT_REF_PATTERN, content):
-            # Extract the slug from the match
-            slug = match.group(2)
-            if slug == old_slug:
-                # Store the match information
-                matches.append(
-                    {
-                        "start": match.start(),
-                        "end": match.end(),
-                        "full_match": match.group(0),
-                        "args": match.group(3) or "",
-                        "is_jinja": True,
-                    }
-                )
-
-        if not matches:
+        # Most files don't mention any of the slugs; check the raw bytes
+        # before decoding or scanning anything
+        raw = file_path.read_bytes()
+        if not _mentions_any(raw, renames):
             return False
 
-        # Update each reference
-        # We need to work backwards to prevent position shifts
-        updates = []
-        for match in sorted(matches, key=lambda m: m["start"], reverse=True):
-            # Create updated reference text
-            old_ref_text = match["full_match"]
-            if match["is_jinja"]:
-                # Jinja style: {{ @old-slug(...) }} -> {{ @new-slug(...) }}
-                new_ref_text = old_ref_text.replace(f"@{old_slug}", f"@{new_slug}")
-            else:
-                # Legacy style: @old-slug(...) -> @new-slug(...)
-                new_ref_text = f"@{new_slug}{match['args']}"
-
-            updates.append((match["start"], match["end"], new_ref_text))
-
-        # Apply updates from end to beginning to maintain position integrity
-        modified_content = content
-        for start, end, replacement in updates:
-            modified_content = (
-                modified_content[:start] + replacement + modified_content[end:]
-            )
+        # Only the template body can hold references. Patch it as text and
+        # keep the frontmatter exactly as written, rather than round-tripping
+        # the file through PromptFile.load and save.
+        text = raw.decode("utf-8")
+        frontmatter_match = FRONTMATTER_PATTERN.match(text)
+        body_start = frontmatter_match.start(2) if frontmatter_match else 0
+        content = text[body_start:]
+
+        # Find every Jinja2-style reference once, whichever slug it names, and
+        # rewrite the ones being renamed. Matches come in ascending position
+        # order, so the updates can be applied in a single pass, joining the
+        # untouched slices and replacements once.
+        parts = [text[:body_start]]
+        cursor = 0
+        for match in JINJA_FRAGMENT_REF_PATTERN.finditer(content):
+            old_slug = match.group(1)
+            new_slug = renames.get(old_slug)
+            if new_slug is None:
+                continue
+
+            # {{ @old-slug(...) }} -> {{ @new-slug(...) }}
+            new_ref_text = match.group(0).replace(f"@{old_slug}", f"@{new_slug}")
+            parts.append(content[cursor : match.start()])
+            parts.append(new_ref_text)
+            cursor = match.end()
+
+        if cursor == 0:
+            return False
+
+        parts.append(content[cursor:])
+        modified_text = "".join(parts)
 
         # Save changes if modifications were made
-        if modified_content != content:
-            prompt_file.markdown_template = modified_content
-            prompt_file.save(file_path)
+        if modified_text != text:
+            _write_atomically(file_path, modified_text)
             return True
 
     except Exception as e:
@@ -95,6 +111,50 @@ def update_references_in_file(file_path: Path, old_slug: str, new_slug: str) ->
     return False
 
 
+def _mentions_any(raw: bytes, renames: Mapping[str, str]) -> bool:
+    """
+    Check whether raw file contents mention any of the slugs being renamed.
+
+    Args:
+        raw: The raw file contents
+        renames: Map of old fragment slugs to new slugs
+
+    Returns:
+        bool: True if any "@old-slug" appears in the contents
+    """
+    if len(renames) == 1:
+        (old_slug,) = renames
+        return f"@{old_slug}".encode("utf-8") in raw
+
+    # One compiled alternation scans the file once for all of the slugs
+    needles = b"|".join(re.escape(slug.encode("utf-8")) for slug in renames)
+    return re.search(b"@(?:" + needles + b")", raw) is not None
+
+
+def _write_atomically(file_path: Path, text: str) -> None:
+    """
+    Replace the contents of a file so readers never see a partial write.
+
+    Symlinks are followed, so the file they point to is replaced rather than
+    the link itself.
+
+    Args:
+        file_path: Path to the file to replace
+        text: The new contents of the file
+    """
+    file_path = file_path.resolve()
+    fd, temp_name = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        # mkstemp creates the file private to the owner; keep the original mode
+        shutil.copymode(file_path, temp_name)
+        os.replace(temp_name, file_path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
 def update_references(
     prompt_context: PromptContext, old_slug: str, new_slug: str
 ) -> Dict[str, bool]:
@@ -106,29 +166,77 @@ def update_references(
         old_slug: Old fragment slug to replace
         new_slug: New fragment slug to use
 
+    Returns:
+        Dict[str, bool]: Map of file paths to whether they were updated
+    """
+
+    def update_file(file_path: Path) -> bool:
+        return update_references_in_file(file_path, old_slug, new_slug)
+
+    return _update_prompt_files(prompt_context, update_file)
+
+
+def update_references_bulk(
+    prompt_context: PromptContext, renames: Mapping[str, str]
+) -> Dict[str, bool]:
+    """
+    Update references to several slugs in all prompt files.
+
+    Each file is read and scanned once for all of the renames, rather than
+    once per rename.
+
+    Args:
+        prompt_context: The PromptContext to use for finding files
+        renames: Map of old fragment slugs to the new slugs to use
+
+    Returns:
+        Dict[str, bool]: Map of file paths to whether they were updated
+    """
+
+    def update_file(file_path: Path) -> bool:
+        return update_references_in_file_bulk(file_path, renames)
+
+    return _update_prompt_files(prompt_context, update_file)
+
+
+def _update_prompt_files(
+    prompt_context: PromptContext, update_file: Callable[[Path], bool]
+) -> Dict[str, bool]:
+    """
+    Apply a reference update to every prompt file.
+
+    Args:
+        prompt_context: The PromptContext to use for finding files
+        update_file: Updates one file, returning whether it changed
+
     Returns:
         Dict[str, bool]: Map of file paths to whether they were updated
     """
     # Load all available prompt files
     prompt_files = prompt_context.load_all()
 
-    # Track files that were updated
-    updated_files = {}
-
-    # Check for references in all prompt files
+    # Resolve the path of every prompt file first, so the files can then be
+    # scanned and rewritten concurrently
+    file_paths: List[Path] = []
     for category in ["_fragment_prompts", "_project_prompts", "_language_prompts"]:
         if hasattr(prompt_files, category):
             prompts = getattr(prompt_files, category)
-            for slug, prompt_file in prompts.items():
+            for slug in prompts:
                 # Find the file path for this prompt
                 try:
                     file_path = prompt_context.parse_prompt_slug(slug)
                     assert file_path is not None
-                    # Update references in this file
-                    updated = update_references_in_file(file_path, old_slug, new_slug)
-                    updated_files[str(file_path)] = updated
+                    file_paths.append(file_path)
                 except (OSError, ValueError, AssertionError) as e:
                     logger.debug(f"Skipping {slug}: {e}")
                     continue
 
-    return updated_files
+    # Updating a file is dominated by disk I/O, which releases the GIL, so
+    # threads overlap the reads and writes of different files
+    def update_path(file_path: Path) -> Tuple[str, bool]:
+        return str(file_path), update_file(file_path)
+
+    # Several slugs can resolve to one file; update each file only once so
+    # no two threads write the same file
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+        return dict(executor.map(update_path, dict.fromkeys(file_paths)))
@@ -3,111 +3,186 @@ Pytest configuration file.
 """
 
 import os
+import subprocess
 import sys
+from contextlib import ExitStack
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
+from click.testing import CliRunner
 
-# Add the src directory to the Python path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-# Add the tests directory to the Python path to allow importing from tests
-sys.path.insert(0, str(Path(__file__).parent))
+# A RAM-backed directory for tmp_path and friends, where the platform has one
+SHM_DIR = Path("/dev/shm")
 
-# Import our editor mocking utility
-from utils.editor_mock import EditorMock
 
+def pytest_configure(config):
+    """Make the package and the test utilities importable, once."""
+    # The src directory, and the tests directory to allow importing from tests
+    for path in (Path(__file__).parent.parent / "src", Path(__file__).parent):
+        entry = str(path)
+        if entry not in sys.path:
+            sys.path.insert(0, entry)
 
-@pytest.fixture
-def mock_cli_env():
-    """Fixture to set up all necessary mocks for CLI tests."""
-    with (
-        patch("prompy.editor.edit_file_with_comments", return_value=True) as mock_edit,
-        patch(
-            "prompy.cli.ensure_config_dirs",
-            return_value=(
-                Path("config"),
-                Path("config/prompts"),
-                Path("config/cache"),
-                Path("config/detections.yaml"),
-            ),
-        ) as mock_config,
-        patch.dict(os.environ, {"EDITOR": "nano"}),
-    ):
-        yield mock_edit, mock_config
+    # Keep temporary test files in memory unless a temp root is already chosen.
+    # This runs before any tmp_path is created, and xdist workers inherit it.
+    # pytest makes its own pytest-of-<user> directory under the root.
+    if "PYTEST_DEBUG_TEMPROOT" not in os.environ and os.access(SHM_DIR, os.W_OK):
+        os.environ["PYTEST_DEBUG_TEMPROOT"] = str(SHM_DIR)
 
 
-@pytest.fixture(autouse=True)
-def mock_editor_autouse(request, monkeypatch):
-    """
-    Fixture to automatically mock the editor for all tests.
+@pytest.fixture(scope="session")
+def runner():
+    """A CliRunner shared by the session; invocations don't share state."""
+    return CliRunner()
+
+
+# What the mocked ensure_config_dirs returns in CLI tests
+MOCK_CONFIG_DIRS = (
+    Path("config"),
+    Path("config/prompts"),
+    Path("config/cache"),
+    Path("config/detections.yaml"),
+)
+
+
+def mock_ensure_config_dirs():
+    """Stand-in for ensure_config_dirs in CLI tests, returning MOCK_CONFIG_DIRS."""
+    return MOCK_CONFIG_DIRS
+
+
+@pytest.fixture(scope="session")
+def cli_env_mocks():
+    """The editor mock used by mock_cli_env, created once for the session."""
+    return MagicMock(return_value=True)
 
-    This ensures no real editor is ever launched during tests.
-    Individual tests can still override this by using EditorMock
-    with specific content or edit functions.
 
-    This fixture skips tests that are testing the editor mocking itself,
-    as those tests manage their own mocking.
+@pytest.fixture
+def mock_cli_env(cli_env_mocks):
     """
-    # Skip for tests in classes that test editor mocking
-    skip_classes = ["TestEditorMockUtility", "TestAdvancedEditorMocking"]
-    # Skip for tests in files that test editor mocking
-    skip_modules = ["test_editor_mocking"]
-
-    if (request.node.cls and request.node.cls.__name__ in skip_classes) or (
-        request.module.__name__.split(".")[-1] in skip_modules
-    ):
-        yield
-        return
+    Fixture to set up all necessary mocks for CLI tests.
 
-    # Import here to avoid circular imports
-    from prompy import editor
+    The editor mock is shared by the session and reset for each test. The
+    patches themselves are only active during tests that use this fixture.
+    """
+    mock_edit = cli_env_mocks
+    mock_edit.reset_mock(return_value=True, side_effect=True)
+    mock_edit.return_value = True
+
+    with ExitStack() as stack:
+        stack.enter_context(patch("prompy.editor.edit_file_with_comments", mock_edit))
+        stack.enter_context(
+            patch("prompy.cli.ensure_config_dirs", new=mock_ensure_config_dirs)
+        )
+        stack.enter_context(patch.dict(os.environ, {"EDITOR": "nano"}))
+        yield mock_edit, mock_ensure_config_dirs
 
-    default_content = "This is the default edited content from the autouse fixture."
 
-    # Define mock function with a more prominent print statement for debugging
-    def mock_launch_editor(file_path):
-        """Mock implementation of launch_editor."""
-        print(f"\nMOCK EDITOR: Using autouse mock for {file_path}")
+@pytest.fixture
+def confirm_yes(monkeypatch):
+    """Answer yes to any click.confirm prompt during the test."""
+    monkeypatch.setattr("click.confirm", lambda *args, **kwargs: True)
 
-        # Validate file_path
-        if not file_path or not isinstance(file_path, (str, os.PathLike)):
-            raise ValueError(f"Invalid file path: {file_path}")
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-        except Exception:
-            content = ""
+# Tests in these classes and modules test editor mocking, and manage their own
+_SKIP_CLASSES = frozenset({"TestEditorMockUtility", "TestAdvancedEditorMocking"})
+_SKIP_MODULES = frozenset({"test_editor_mocking"})
 
-        # Write the new content to the file
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(default_content)
+DEFAULT_EDITED_CONTENT = "This is the default edited content from the autouse fixture."
 
-        return 0  # Success
 
-    # Use monkeypatch instead of direct module attribute modification
-    monkeypatch.setattr(editor, "launch_editor", mock_launch_editor)
+def mock_launch_editor(file_path):
+    """Mock implementation of launch_editor."""
+    print(f"\nMOCK EDITOR: Using autouse mock for {file_path}")
+
+    # Validate file_path
+    if not file_path or not isinstance(file_path, (str, os.PathLike)):
+        raise ValueError(f"Invalid file path: {file_path}")
+
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except Exception:
+        content = ""
+
+    # Write the new content to the file
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(DEFAULT_EDITED_CONTENT)
+
+    return 0  # Success
+
+
+def mock_subprocess_run(args, *pargs, **kwargs):
+    """Mock implementation of subprocess.run that never spawns a process."""
+    print(f"\nMOCK SUBPROCESS: Prevented execution of: {args}")
+    mock_result = type(
+        "MockCompletedProcess", (), {"returncode": 0, "stdout": "", "stderr": ""}
+    )
+    return mock_result
 
-    # Also patch subprocess.run to prevent any subprocess from being spawned
-    # This is a safety measure in case the patching of launch_editor somehow fails
-    def mock_subprocess_run(args, *pargs, **kwargs):
-        print(f"\nMOCK SUBPROCESS: Prevented execution of: {args}")
-        mock_result = type(
-            "MockCompletedProcess", (), {"returncode": 0, "stdout": "", "stderr": ""}
-        )
-        return mock_result
 
-    import subprocess
+@pytest.fixture
+def block_subprocess(monkeypatch):
+    """
+    Prevent any subprocess from being spawned during a test.
 
+    launch_editor is the only production code that runs an editor, and it is
+    mocked for every test, so this safety net is only needed by tests that
+    exercise the real editor launch path.
+    """
     monkeypatch.setattr(subprocess, "run", mock_subprocess_run)
 
+
+@pytest.fixture(scope="session", autouse=True)
+def _editor_patch_session():
+    """
+    Mock the editor once for the whole test session.
+
+    Yields the editor module and the original launch_editor, so tests that
+    manage their own mocking can have it back without re-importing.
+    """
+    # Import here, as src is only on sys.path once pytest_configure has run
+    from prompy import editor
+
+    original_launch_editor = editor.launch_editor
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(editor, "launch_editor", mock_launch_editor)
+        yield editor, original_launch_editor
+
+
+@pytest.fixture(autouse=True)
+def mock_editor_autouse(request, _editor_patch_session):
+    """
+    Fixture to automatically mock the editor for all tests.
+
+    This ensures no real editor is ever launched during tests.
+    Individual tests can still override this by using EditorMock
+    with specific content or edit functions.
+
+    The mocks are installed once per session by _editor_patch_session. Tests
+    that are testing the editor mocking itself manage their own mocking, so
+    the original is restored for the duration of those tests.
+    """
+    cls = request.node.cls
+    module_name = request.module.__name__.rpartition(".")[2]
+
+    if (cls and cls.__name__ in _SKIP_CLASSES) or module_name in _SKIP_MODULES:
+        editor, original_launch_editor = _editor_patch_session
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(editor, "launch_editor", original_launch_editor)
+            yield
+        return
+
     yield
 
 
 @pytest.fixture
 def mock_editor():
     """Fixture to mock the editor with default edited content."""
+    from utils.editor_mock import EditorMock
+
     default_content = "This is the default edited content."
     with EditorMock.patch_editor(return_content=default_content):
         yield default_content
@@ -120,6 +195,7 @@ def mock_editor_factory():
 
     Returns a function that can be called with custom content or edit function.
     """
+    from utils.editor_mock import EditorMock
 
     def create_mock(return_content=None, edit_function=None):
         return EditorMock.patch_editor(
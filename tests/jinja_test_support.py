@@ -8,72 +8,108 @@ Test module for the Jinj    def mock_load_slug(slug: str) -> PromptFile:
         )gration.
 """
 
-from unittest.mock import MagicMock, patch
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
 
 import pytest
 from jinja2 import Environment
-from jinja2.ext import Extension
 
-from prompy.jinja_extension import PrompyExtension, create_jinja_environment
-from prompy.prompt_context import PromptContext
+from prompy.jinja_extension import (
+    PrompyExtension,
+    RenderState,
+    create_jinja_environment,
+    render_state,
+)
 from prompy.prompt_file import PromptFile
 from prompy.prompt_render import PromptRender
 
 
-def create_test_extension(env: Environment) -> Extension:
+class FakePromptContext:
     """
-    Create a PrompyExtension instance with a mock context for testing.
+    A lightweight stand-in for PromptContext that serves fragments from a dict.
 
-    Args:
-        env: The Jinja2 environment to attach the extension to
-
-    Returns:
-        Extension: The configured extension instance
+    Much cheaper to build than MagicMock(spec=PromptContext), and records the
+    slugs it was asked to load.
     """
-    mock_context = MagicMock(spec=PromptContext)
 
-    # Configure the mock context to return test prompt files
-    def mock_load_slug(slug: str) -> PromptFile:
+    def __init__(self, fragments: Optional[Dict[str, PromptFile]] = None) -> None:
+        self.fragments = fragments if fragments is not None else {}
+        self.load_slug_calls: List[str] = []
+
+    def load_slug(self, slug: str) -> PromptFile:
+        self.load_slug_calls.append(slug)
+        return self.fragments[slug]
+
+
+class _GeneratedFragments(dict):
+    """Fragments that are made up on demand for any slug."""
+
+    def __missing__(self, slug: str) -> PromptFile:
         return PromptFile(
             slug=slug,
             description=f"Test prompt for {slug}",
             markdown_template=f"Content for {slug}",
         )
 
-    mock_context.load_slug.side_effect = mock_load_slug
 
-    # Get the extension instance
-    ext = env.extensions[PrompyExtension.identifier]
-
-    # Set up the environment globals
-    env.globals["_prompy_context"] = mock_context
-    env.globals["_fragment_stack"] = []
+@contextmanager
+def fake_render_state() -> Iterator[RenderState]:
+    """
+    Set a render state with a fake context for templates rendered directly.
 
-    return ext
+    Yields:
+        RenderState: The state include_fragment reads while the block runs
+    """
+    state = RenderState(
+        context=FakePromptContext(_GeneratedFragments()),
+        fragment_stack=[],
+        resolution_tracking=False,
+    )
+    token = render_state.set(state)
+    try:
+        yield state
+    finally:
+        render_state.reset(token)
 
 
 def test_jinja_environment_creation():
     """Test creating a Jinja2 environment."""
-    # Setup
-    mock_context = MagicMock(spec=PromptContext)
-
     # Create environment
-    env = create_jinja_environment(mock_context)
+    env = create_jinja_environment()
 
     # Assertions
     assert isinstance(env, Environment)
     assert PrompyExtension in [type(ext) for ext in env.extensions.values()]
-    assert "_prompy_context" in env.globals
-    assert "_fragment_stack" in env.globals
-    assert env.globals["_prompy_context"] == mock_context
-    assert env.globals["_fragment_stack"] == []
+    # Per-render state is kept out of the shared environment
+    assert "_prompy_context" not in env.globals
+    assert "_fragment_stack" not in env.globals
+
+
+def test_include_fragment_requires_render_state(jinja_env):
+    """Test that including a fragment outside a render fails loudly."""
+    template = jinja_env.from_string("{{ @fragment }}")
+
+    with pytest.raises(RuntimeError, match="no render in progress"):
+        template.render()
+
+    with fake_render_state():
+        assert template.render() == "Content for fragment"
+
+
+@pytest.fixture(scope="session")
+def jinja_env():
+    """
+    A Prompy Jinja2 environment shared by the session.
+
+    Tests that change its globals must restore them.
+    """
+    return create_jinja_environment()
 
 
-def test_slug_extension_preprocessing():
+def test_slug_extension_preprocessing(jinja_env):
     """Test the SlugExtension token processing."""
     # Setup
-    mock_context = MagicMock(spec=PromptContext)
-    env = create_jinja_environment(mock_context)
+    env = jinja_env
 
     # Test simple template rendering with @slug
     template_source = "Template with {{ @fragment }} here"
@@ -83,29 +119,71 @@ def test_slug_extension_preprocessing():
     original_include = env.globals["include_fragment"]
     env.globals["include_fragment"] = lambda slug, *args, **kwargs: f"INCLUDED-{slug}"
 
-    # Render the template
-    result = template.render()
-
-    # Restore the original include_fragment method
-    env.globals["include_fragment"] = original_include
+    try:
+        # Render the template
+        result = template.render()
+    finally:
+        # Restore the original include_fragment method
+        env.globals["include_fragment"] = original_include
 
     # Check that the @fragment was processed correctly
     assert result == "Template with INCLUDED-fragment here"
 
 
-def test_render_simple_template():
-    """Test rendering a template with no fragment references."""
-    # Setup
-    prompt_file = PromptFile(
+# Prompt files shared by the session. Rendering never modifies them, and no
+# test may write to them.
+
+
+@pytest.fixture(scope="session")
+def simple_file():
+    """A prompt file with no fragment references."""
+    return PromptFile(
         slug="test",
         markdown_template="This is a simple template with no fragments.",
     )
 
+
+@pytest.fixture(scope="session")
+def other_fragment_file():
+    """A fragment with no arguments."""
+    return PromptFile(
+        slug="other-fragment", markdown_template="fragment content", arguments={}
+    )
+
+
+@pytest.fixture(scope="session")
+def arg_fragment_file():
+    """A fragment with one required and one defaulted argument."""
+    return PromptFile(
+        slug="fragment",
+        markdown_template="Fragment with {{ arg1 }} and {{ key }}",
+        arguments={"arg1": None, "key": "default"},
+    )
+
+
+@pytest.fixture(scope="session")
+def cycle_fragments():
+    """Prompt files that reference each other in a cycle, by slug."""
+    return {
+        "main": PromptFile(
+            slug="main", markdown_template="Template with {{ @fragment1 }}"
+        ),
+        "fragment1": PromptFile(
+            slug="fragment1", markdown_template="Fragment1 with {{ @fragment2 }}"
+        ),
+        "fragment2": PromptFile(
+            slug="fragment2", markdown_template="Fragment2 with {{ @main }}"
+        ),
+    }
+
+
+def test_render_simple_template(simple_file):
+    """Test rendering a template with no fragment references."""
     # Create a PromptRender instance
-    renderer = PromptRender(prompt_file)
+    renderer = PromptRender(simple_file)
 
-    # Mock context
-    mock_context = MagicMock(spec=PromptContext)
+    # Fake context
+    mock_context = FakePromptContext()
 
     # Render
     result = renderer.render(mock_context)
@@ -113,47 +191,32 @@ def test_render_simple_template():
     # Assert
     assert result == "This is a simple template with no fragments."
     # No fragment lookups should have happened
-    mock_context.load_slug.assert_not_called()
+    assert mock_context.load_slug_calls == []
 
 
-def test_render_with_fragment():
+def test_render_with_fragment(other_fragment_file):
     """Test rendering a template with a single fragment reference."""
     # Setup
     main_file = PromptFile(
         slug="main", markdown_template="Template: {{ @other-fragment }} here"
     )
 
-    fragment_file = PromptFile(
-        slug="other-fragment", markdown_template="fragment content", arguments={}
-    )
-
     # Setup context
-    mock_context = MagicMock(spec=PromptContext)
-    mock_context.load_slug.return_value = fragment_file
-
-    # Setup environment context access
-    def get_context_item(key, default=None):
-        if key == "_prompy_context":
-            return mock_context
-        elif key == "_fragment_stack":
-            return []
-        return default
+    mock_context = FakePromptContext({"other-fragment": other_fragment_file})
 
-    # Patch the Environment.context.get method
-    with patch("jinja2.runtime.Context.get", side_effect=get_context_item):
-        # Create renderer
-        renderer = PromptRender(main_file)
+    # Create renderer; the render passes the context to fragments itself
+    renderer = PromptRender(main_file)
 
-        # Render
-        result = renderer.render(mock_context)
+    # Render
+    result = renderer.render(mock_context)
 
-        # Assert
-        mock_context.load_slug.assert_called_once_with("other-fragment")
-        expected = "Template: fragment content here"
-        assert result == expected
+    # Assert
+    assert mock_context.load_slug_calls == ["other-fragment"]
+    expected = "Template: fragment content here"
+    assert result == expected
 
 
-def test_render_with_arguments():
+def test_render_with_arguments(arg_fragment_file):
     """Test rendering a template with arguments."""
     # Setup
     main_file = PromptFile(
@@ -163,85 +226,33 @@ def test_render_with_arguments():
         ),
     )
 
-    fragment_file = PromptFile(
-        slug="fragment",
-        markdown_template="Fragment with {{ arg1 }} and {{ key }}",
-        arguments={"arg1": None, "key": "default"},
-    )
-
     # Setup context
-    mock_context = MagicMock(spec=PromptContext)
-    mock_context.load_slug.return_value = fragment_file
-
-    # Setup environment context access
-    def get_context_item(key, default=None):
-        if key == "_prompy_context":
-            return mock_context
-        elif key == "_fragment_stack":
-            return []
-        return default
+    mock_context = FakePromptContext({"fragment": arg_fragment_file})
 
-    # Patch the Environment.context.get method
-    with patch("jinja2.runtime.Context.get", side_effect=get_context_item):
-        # Create renderer
-        renderer = PromptRender(main_file)
+    # Create renderer; the render passes the context to fragments itself
+    renderer = PromptRender(main_file)
 
-        # Render
-        result = renderer.render(mock_context)
+    # Render
+    result = renderer.render(mock_context)
 
-        # Assert
-        mock_context.load_slug.assert_called_once_with("fragment")
-        expected = "Template with Fragment with value1 and value2 here"
-        assert result == expected
+    # Assert
+    assert mock_context.load_slug_calls == ["fragment"]
+    expected = "Template with Fragment with value1 and value2 here"
+    assert result == expected
 
 
-def test_cycle_detection():
+def test_cycle_detection(cycle_fragments):
     """Test cycle detection in fragment references."""
-    # Setup cyclical references
-    main_file = PromptFile(
-        slug="main", markdown_template="Template with {{ @fragment1 }}"
-    )
-
-    fragment1_file = PromptFile(
-        slug="fragment1", markdown_template="Fragment1 with {{ @fragment2 }}"
-    )
-
-    fragment2_file = PromptFile(
-        slug="fragment2", markdown_template="Fragment2 with {{ @main }}"
-    )
-
     # Setup context to return our fragments
-    mock_context = MagicMock(spec=PromptContext)
-    mock_context.load_slug.side_effect = lambda slug: {
-        "main": main_file,
-        "fragment1": fragment1_file,
-        "fragment2": fragment2_file,
-    }[slug]
-
-    # Setup environment context access for different stack states
-    stack_states = {
-        "initial": [],
-        "with_main": ["main"],
-        "with_main_fragment1": ["main", "fragment1"],
-    }
-
-    current_stack = stack_states["initial"]
-
-    def get_context_item(key, default=None):
-        if key == "_prompy_context":
-            return mock_context
-        elif key == "_fragment_stack":
-            return current_stack
-        return default
+    mock_context = FakePromptContext(cycle_fragments)
 
     # Create renderer
-    renderer = PromptRender(main_file)
+    renderer = PromptRender(cycle_fragments["main"])
 
-    # Patch the Environment.context.get method to simulate stack changes
-    with patch("jinja2.runtime.Context.get", side_effect=get_context_item):
-        # Expect a ValueError for cycle detection
-        with pytest.raises(ValueError) as excinfo:
-            result = renderer.render(mock_context)
+    # Expect a ValueError for cycle detection; the render tracks the fragment
+    # stack itself, starting from the main file
+    with pytest.raises(ValueError) as excinfo:
+        renderer.render(mock_context)
 
-        # Check that the error message mentions the cycle
-        assert "Cyclic reference detected" in str(excinfo.value)
+    # Check that the error message mentions the cycle
+    assert "Cyclic reference detected" in str(excinfo.value)
@@ -4,7 +4,8 @@ Tests for the cache module.
 
 import sys
 from pathlib import Path
-from unittest.mock import patch
+
+import pytest
 
 from prompy.cache import (
     append_to_cache,
@@ -16,10 +17,32 @@ from prompy.cache import (
     save_to_cache,
 )
 
+NO_PROJECT_NAMES = pytest.mark.parametrize("project_name", ["", None])
+
+
+@pytest.fixture(scope="module")
+def cache_root(tmp_path_factory):
+    """A directory shared by the module's tests, each using its own subdir."""
+    return tmp_path_factory.mktemp("cache_tests")
+
+
+@pytest.fixture
+def cache_dir(cache_root, request):
+    """A not-yet-created cache directory unique to the current test."""
+    return cache_root / request.node.name
 
-def test_ensure_cache_dir(tmp_path):
+
+@pytest.fixture
+def project_cache(cache_dir):
+    """Create a project cache directory, returning it with the cache file path."""
+    project_name = "test-project"
+    project_cache_dir = cache_dir / project_name
+    project_cache_dir.mkdir(parents=True)
+    return cache_dir, project_name, project_cache_dir / "CURRENT_FILE.md"
+
+
+def test_ensure_cache_dir(cache_dir):
     """Test that ensure_cache_dir creates the appropriate directories."""
-    cache_dir = tmp_path / "cache"
     project_name = "test-project"
 
     result = ensure_cache_dir(cache_dir, project_name)
@@ -29,9 +52,8 @@ def test_ensure_cache_dir(tmp_path):
     assert result.is_dir()
 
 
-def test_get_cache_file_path(tmp_path):
+def test_get_cache_file_path(cache_dir):
     """Test that get_cache_file_path returns the correct path."""
-    cache_dir = tmp_path / "cache"
     project_name = "test-project"
 
     result = get_cache_file_path(cache_dir, project_name)
@@ -42,19 +64,12 @@ def test_get_cache_file_path(tmp_path):
     assert not result.exists()
 
 
-def test_load_from_cache_success(tmp_path):
+def test_load_from_cache_success(project_cache):
     """Test loading from an existing cache file."""
-    cache_dir = tmp_path / "cache"
-    project_name = "test-project"
-
-    # Create the cache file
-    project_cache_dir = cache_dir / project_name
-    project_cache_dir.mkdir(parents=True)
-    cache_file = project_cache_dir / "CURRENT_FILE.md"
+    cache_dir, project_name, cache_file = project_cache
 
     test_content = "Test content"
-    with open(cache_file, "w", encoding="utf-8") as f:
-        f.write(test_content)
+    cache_file.write_text(test_content, encoding="utf-8")
 
     success, content = load_from_cache(cache_dir, project_name)
 
@@ -62,10 +77,10 @@ def test_load_from_cache_success(tmp_path):
     assert content == test_content
 
 
-def test_load_from_cache_no_project():
+@NO_PROJECT_NAMES
+def test_load_from_cache_no_project(project_name):
     """Test loading from cache with no project name."""
     cache_dir = Path("/fake/path")  # Won't be used
-    project_name = ""
 
     success, content = load_from_cache(cache_dir, project_name)
 
@@ -73,9 +88,8 @@ def test_load_from_cache_no_project():
     assert content == ""
 
 
-def test_load_from_cache_nonexistent_file(tmp_path):
+def test_load_from_cache_nonexistent_file(cache_dir):
     """Test loading from a nonexistent cache file."""
-    cache_dir = tmp_path / "cache"
     project_name = "test-project"
 
     success, content = load_from_cache(cache_dir, project_name)
@@ -84,10 +98,9 @@ def test_load_from_cache_nonexistent_file(tmp_path):
     assert content == ""
 
 
-def test_save_to_cache_success(tmp_path):
+def test_save_to_cache_success(project_cache):
     """Test saving to cache successfully."""
-    cache_dir = tmp_path / "cache"
-    project_name = "test-project"
+    cache_dir, project_name, cache_file = project_cache
     test_content = "Test content"
 
     result = save_to_cache(cache_dir, project_name, test_content)
@@ -95,36 +108,24 @@ def test_save_to_cache_success(tmp_path):
     assert result is True
 
     # Verify the content was written correctly
-    cache_file = cache_dir / project_name / "CURRENT_FILE.md"
     assert cache_file.exists()
-    with open(cache_file, "r", encoding="utf-8") as f:
-        content = f.read()
-    assert content == test_content
+    assert cache_file.read_text(encoding="utf-8") == test_content
 
 
-def test_save_to_cache_no_project():
+@NO_PROJECT_NAMES
+def test_save_to_cache_no_project(project_name):
     """Test saving to cache with no project name."""
     cache_dir = Path("/fake/path")  # Won't be used
-    project_name = ""
-    test_content = "Test content"
 
-    result = save_to_cache(cache_dir, project_name, test_content)
+    result = save_to_cache(cache_dir, project_name, "Test content")
 
     assert result is False
 
 
-def test_clear_cache_success(tmp_path):
+def test_clear_cache_success(project_cache):
     """Test clearing the cache successfully."""
-    cache_dir = tmp_path / "cache"
-    project_name = "test-project"
-
-    # Create the cache file
-    project_cache_dir = cache_dir / project_name
-    project_cache_dir.mkdir(parents=True)
-    cache_file = project_cache_dir / "CURRENT_FILE.md"
-
-    with open(cache_file, "w", encoding="utf-8") as f:
-        f.write("Test content")
+    cache_dir, project_name, cache_file = project_cache
+    cache_file.write_text("Test content", encoding="utf-8")
 
     result = clear_cache(cache_dir, project_name)
 
@@ -132,19 +133,18 @@ def test_clear_cache_success(tmp_path):
     assert not cache_file.exists()
 
 
-def test_clear_cache_no_project():
+@NO_PROJECT_NAMES
+def test_clear_cache_no_project(project_name):
     """Test clearing cache with no project name."""
     cache_dir = Path("/fake/path")  # Won't be used
-    project_name = ""
 
     result = clear_cache(cache_dir, project_name)
 
     assert result is False
 
 
-def test_clear_cache_nonexistent_file(tmp_path):
+def test_clear_cache_nonexistent_file(cache_dir):
     """Test clearing a nonexistent cache file."""
-    cache_dir = tmp_path / "cache"
     project_name = "test-project"
 
     result = clear_cache(cache_dir, project_name)
@@ -152,19 +152,13 @@ def test_clear_cache_nonexistent_file(tmp_path):
     assert result is True  # No file to delete is still a success
 
 
-def test_append_to_cache_success(tmp_path):
+def test_append_to_cache_success(project_cache):
     """Test appending to cache successfully."""
-    cache_dir = tmp_path / "cache"
-    project_name = "test-project"
+    cache_dir, project_name, cache_file = project_cache
 
     # Create the cache file with initial content
-    project_cache_dir = cache_dir / project_name
-    project_cache_dir.mkdir(parents=True)
-    cache_file = project_cache_dir / "CURRENT_FILE.md"
-
     initial_content = "Initial content"
-    with open(cache_file, "w", encoding="utf-8") as f:
-        f.write(initial_content)
+    cache_file.write_text(initial_content, encoding="utf-8")
 
     append_content = "Appended content"
     result = append_to_cache(cache_dir, project_name, append_content)
@@ -172,14 +166,12 @@ def test_append_to_cache_success(tmp_path):
     assert result is True
 
     # Verify the content was appended correctly
-    with open(cache_file, "r", encoding="utf-8") as f:
-        content = f.read()
+    content = cache_file.read_text(encoding="utf-8")
     assert content == f"{initial_content}\n\n{append_content}"
 
 
-def test_append_to_cache_empty_file(tmp_path):
+def test_append_to_cache_empty_file(cache_dir):
     """Test appending to an empty cache file."""
-    cache_dir = tmp_path / "cache"
     project_name = "test-project"
 
     append_content = "Appended content"
@@ -189,25 +181,21 @@ def test_append_to_cache_empty_file(tmp_path):
 
     # Verify the content was written correctly
     cache_file = cache_dir / project_name / "CURRENT_FILE.md"
-    with open(cache_file, "r", encoding="utf-8") as f:
-        content = f.read()
-    assert content == append_content
+    assert cache_file.read_text(encoding="utf-8") == append_content
 
 
-def test_append_to_cache_no_project():
+@NO_PROJECT_NAMES
+def test_append_to_cache_no_project(project_name):
     """Test appending to cache with no project name."""
     cache_dir = Path("/fake/path")  # Won't be used
-    project_name = ""
-    append_content = "Appended content"
 
-    result = append_to_cache(cache_dir, project_name, append_content)
+    result = append_to_cache(cache_dir, project_name, "Appended content")
 
     assert result is False
 
 
-def test_append_to_cache_no_content(tmp_path):
+def test_append_to_cache_no_content(cache_dir):
     """Test appending empty content to cache."""
-    cache_dir = tmp_path / "cache"
     project_name = "test-project"
     append_content = ""
 
@@ -216,18 +204,18 @@ def test_append_to_cache_no_content(tmp_path):
     assert result is False
 
 
-def test_read_from_stdin_tty():
-    """Test reading from stdin when it's a TTY."""
-    with patch.object(sys.stdin, "isatty", return_value=True):
-        result = read_from_stdin()
-        assert result is None
-
+@pytest.mark.parametrize(
+    "isatty,read_value,expected",
+    [
+        (True, None, None),
+        (False, "Input from stdin", "Input from stdin"),
+    ],
+    ids=["tty", "piped"],
+)
+def test_read_from_stdin(monkeypatch, isatty, read_value, expected):
+    """Test reading from stdin, which is only read when it isn't a TTY."""
+    monkeypatch.setattr(sys.stdin, "isatty", lambda: isatty)
+    if read_value is not None:
+        monkeypatch.setattr(sys.stdin, "read", lambda: read_value)
 
-def test_read_from_stdin_not_tty():
-    """Test reading from stdin when it's not a TTY."""
-    with (
-        patch.object(sys.stdin, "isatty", return_value=False),
-        patch.object(sys.stdin, "read", return_value="Input from stdin"),
-    ):
-        result = read_from_stdin()
-        assert result == "Input from stdin"
+    assert read_from_stdin() == expected
@@ -3,71 +3,61 @@ Tests for CLI output formatting enhancements.
 """
 
 import json
-import os
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
-from click.testing import CliRunner
 
 from prompy.cli import cli
 
+FAKE_CONFIG_DIR = Path("/fake/config")
+FAKE_PROMPTS_DIR = FAKE_CONFIG_DIR / "prompts"
+FAKE_CACHE_DIR = FAKE_CONFIG_DIR / "cache"
+
+# Project prompt files written for every test
+TEST_PROMPTS = {
+    "test-prompt1.md": (
+        "---\ndescription: A test prompt with categories\n"
+        "categories: ['test', 'example']\n---\nTest content 1"
+    ),
+    "test-prompt2.md": (
+        "---\ndescription: Another test prompt\n"
+        "categories: ['example']\n---\nTest content 2"
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def cli_patches():
+    """Patch the config dirs once for the module."""
+    config_dirs = (
+        FAKE_CONFIG_DIR,
+        FAKE_PROMPTS_DIR,
+        FAKE_CACHE_DIR,
+        FAKE_CONFIG_DIR / "detections.yaml",
+    )
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("prompy.cli.ensure_config_dirs", lambda: config_dirs)
+        yield
+
 
 @pytest.fixture
-def mock_format_env(tmp_path, monkeypatch):
+def mock_format_env(fs, cli_patches):
     """Fixture to set up a mock environment for format testing."""
-    # Create cache directories
-    cache_dir = tmp_path / "cache"
-    cache_dir.mkdir()
-
-    # Create prompts directory
-    prompts_dir = tmp_path / "prompts"
-    prompts_dir.mkdir()
+    # Create the cache directory, with a project cache dir
+    fs.create_dir(FAKE_CACHE_DIR / "test-project")
 
     # Create test project prompts
-    project_prompts_dir = prompts_dir / "projects" / "test-project"
-    project_prompts_dir.mkdir(parents=True)
-
-    test_prompts = {
-        "test-prompt1.md": {
-            "description": "A test prompt with categories",
-            "categories": ["test", "example"],
-            "content": "Test content 1",
-        },
-        "test-prompt2.md": {
-            "description": "Another test prompt",
-            "categories": ["example"],
-            "content": "Test content 2",
-        },
-    }
-
-    for name, data in test_prompts.items():
-        prompt_file = project_prompts_dir / name
-        prompt_content = f"""---
-description: {data["description"]}
-categories: {data["categories"]}
----
-{data["content"]}"""
-        prompt_file.parent.mkdir(parents=True, exist_ok=True)
-        prompt_file.write_text(prompt_content)
-
-    with (
-        patch(
-            "prompy.cli.ensure_config_dirs",
-            return_value=(
-                tmp_path,
-                prompts_dir,
-                cache_dir,
-                tmp_path / "detections.yaml",
-            ),
-        ),
-        patch.dict(os.environ, {"EDITOR": "nano"}),
-    ):
-        yield tmp_path, prompts_dir, cache_dir
-
-
-def test_list_json_format(mock_format_env):
+    project_prompts_dir = FAKE_PROMPTS_DIR / "projects" / "test-project"
+    for name, content in TEST_PROMPTS.items():
+        fs.create_file(project_prompts_dir / name, contents=content)
+
+    return FAKE_CONFIG_DIR, FAKE_PROMPTS_DIR, FAKE_CACHE_DIR
+
+
+def test_list_json_format(runner, mock_format_env):
     """Test the list command with JSON output format."""
-    runner = CliRunner()
     result = runner.invoke(
         cli,
         ["--project", "test-project", "list", "--json"],
@@ -88,9 +78,8 @@ def test_list_json_format(mock_format_env):
     assert "categories" in prompt
 
 
-def test_list_with_category_filter(mock_format_env):
+def test_list_with_category_filter(runner, mock_format_env):
     """Test the list command with category filtering."""
-    runner = CliRunner()
     result = runner.invoke(
         cli,
         ["--project", "test-project", "list", "--category", "test"],
@@ -102,14 +91,12 @@ def test_list_with_category_filter(mock_format_env):
     assert "test-prompt2" not in result.output  # Doesn't have 'test' category
 
 
-def test_colorized_output(mock_format_env):
+def test_colorized_output(runner, mock_format_env):
     """Test colorized output in terminal."""
-    tmp_path, prompts_dir, cache_dir = mock_format_env
-    runner = CliRunner()
+    config_dir, prompts_dir, cache_dir = mock_format_env
 
     test_content = "Test colorized output"
     cache_file = cache_dir / "test-project" / "CURRENT_FILE.md"
-    cache_file.parent.mkdir(parents=True, exist_ok=True)
     cache_file.write_text(test_content)
 
     with patch("sys.stdout.isatty", return_value=True):
@@ -117,14 +104,12 @@ def test_colorized_output(mock_format_env):
         assert result.exit_code == 0
 
 
-def test_plain_output_when_redirected(mock_format_env):
+def test_plain_output_when_redirected(runner, mock_format_env):
     """Test plain output when redirected."""
-    tmp_path, prompts_dir, cache_dir = mock_format_env
-    runner = CliRunner()
+    config_dir, prompts_dir, cache_dir = mock_format_env
 
     test_content = "Test plain output"
     cache_file = cache_dir / "test-project" / "CURRENT_FILE.md"
-    cache_file.parent.mkdir(parents=True, exist_ok=True)
     cache_file.write_text(test_content)
 
     with patch("sys.stdout.isatty", return_value=False):
@@ -2,103 +2,95 @@
 Tests for CLI management commands: list, mv, cp, rm.
 """
 
-from unittest.mock import MagicMock, patch
+from pathlib import Path
+from unittest.mock import patch
 
 import pytest
-from click.testing import CliRunner
 
 from prompy.cli import cli
 
+FAKE_CONFIG_DIR = Path("/fake/config")
+FAKE_PROMPTS_DIR = FAKE_CONFIG_DIR / "prompts"
+
+# Options that skip project and language detection
+CLI_OPTIONS = ["--project", "test-project", "--language", "python"]
+# Prompt files written under the prompts directory for every test
+TEST_PROMPTS = {
+    "fragments/test-fragment.md": (
+        "---\ndescription: A test fragment\ncategories: [test, sample]\n---\n"
+        "Test fragment content"
+    ),
+    "fragments/another-fragment.md": (
+        "---\ndescription: Another fragment\ncategories: [sample]\n---\n"
+        "Another fragment content"
+    ),
+    "languages/python/test-lang-fragment.md": (
+        "---\ndescription: A language fragment\ncategories: [python, test]\n---\n"
+        "Test language content"
+    ),
+    "projects/test-project/test-project-fragment.md": (
+        "---\ndescription: A project fragment\ncategories: [project, test]\n---\n"
+        "Test project content"
+    ),
+}
+
+
+# Paths that prompt slugs resolve to
+FRAGMENTS_DIR = FAKE_PROMPTS_DIR / "fragments"
+LANGUAGES_DIR = FAKE_PROMPTS_DIR / "languages" / "python"
+PROJECTS_DIR = FAKE_PROMPTS_DIR / "projects" / "test-project"
+SLUG_PATHS = {
+    "test-fragment": FRAGMENTS_DIR / "test-fragment.md",
+    "another-fragment": FRAGMENTS_DIR / "another-fragment.md",
+    "renamed-fragment": FRAGMENTS_DIR / "renamed-fragment.md",
+    "copied-fragment": FRAGMENTS_DIR / "copied-fragment.md",
+    "language/test-lang-fragment": LANGUAGES_DIR / "test-lang-fragment.md",
+    "project/test-project-fragment": PROJECTS_DIR / "test-project-fragment.md",
+}
+
+
+def mock_parse_slug(self, slug, should_exist=True, global_only=False):
+    """Resolve a slug to its test path, to ensure correct path resolution."""
+    return SLUG_PATHS.get(slug)
+
+
+@pytest.fixture(scope="module")
+def cli_patches():
+    """Patch config, project and language detection once for the module."""
+    config_dirs = (
+        FAKE_CONFIG_DIR,
+        FAKE_PROMPTS_DIR,
+        FAKE_CONFIG_DIR / "cache",
+        FAKE_CONFIG_DIR / "detections.yaml",
+    )
 
-@pytest.fixture
-def mock_management_env(tmp_path, monkeypatch):
-    """Fixture to set up a mock environment for management commands."""
-    # Create test config and prompts directories
-    config_dir = tmp_path / "config"
-    prompts_dir = config_dir / "prompts"
-    fragments_dir = prompts_dir / "fragments"
-    languages_dir = prompts_dir / "languages" / "python"
-    projects_dir = prompts_dir / "projects" / "test-project"
-
-    for dir_path in [fragments_dir, languages_dir, projects_dir]:
-        dir_path.mkdir(parents=True, exist_ok=True)
-
-    # Create some test prompts
-    test_files = {
-        fragments_dir / "test-fragment.md": (
-            "---\ndescription: A test fragment\ncategories: [test, sample]\n---\n"
-            "Test fragment content"
-        ),
-        fragments_dir / "another-fragment.md": (
-            "---\ndescription: Another fragment\ncategories: [sample]\n---\n"
-            "Another fragment content"
-        ),
-        languages_dir / "test-lang-fragment.md": (
-            "---\ndescription: A language fragment\ncategories: [python, test]\n---\n"
-            "Test language content"
-        ),
-        projects_dir / "test-project-fragment.md": (
-            "---\ndescription: A project fragment\ncategories: [project, test]\n---\n"
-            "Test project content"
-        ),
-    }
-
-    for file_path, content in test_files.items():
-        with open(file_path, "w") as f:
-            f.write(content)
-
-    # Mock config detection
-    mock_config_dirs = MagicMock(
-        return_value=(
-            config_dir,
-            prompts_dir,
-            config_dir / "cache",
-            config_dir / "detections.yaml",
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("prompy.cli.ensure_config_dirs", lambda: config_dirs)
+        mp.setattr("prompy.cli.find_project_dir", lambda: Path("/fake/project"))
+        mp.setattr("prompy.cli.detect_language", lambda project_dir: "python")
+        mp.setattr(
+            "prompy.prompt_context.PromptContext.parse_prompt_slug", mock_parse_slug
         )
-    )
+        yield
 
-    # Mock project detection
-    mock_project_dir = MagicMock(return_value=tmp_path / "project")
-
-    # Define a mock for parse_prompt_slug to ensure correct path resolution
-    def mock_parse_slug(self, slug, should_exist=True, global_only=False):
-        if slug == "test-fragment":
-            return fragments_dir / "test-fragment.md"
-        elif slug == "another-fragment":
-            return fragments_dir / "another-fragment.md"
-        elif slug == "renamed-fragment":
-            return fragments_dir / "renamed-fragment.md"
-        elif slug == "copied-fragment":
-            return fragments_dir / "copied-fragment.md"
-        elif slug == "language/test-lang-fragment":
-            return languages_dir / "test-lang-fragment.md"
-        elif slug == "project/test-project-fragment":
-            return projects_dir / "test-project-fragment.md"
-        return None
-
-    # Patch functions that find configs and project directories
-    with (
-        patch("prompy.cli.ensure_config_dirs", mock_config_dirs),
-        patch("prompy.cli.find_project_dir", mock_project_dir),
-        patch("prompy.cli.detect_language", return_value="python"),
-        patch("prompy.prompt_context.PromptContext.parse_prompt_slug", mock_parse_slug),
-    ):
-        # Clear any destination files that might interfere with the tests
-        for test_path in [
-            fragments_dir / "renamed-fragment.md",
-            fragments_dir / "copied-fragment.md",
-        ]:
-            if test_path.exists():
-                test_path.unlink()
 
-        yield config_dir, prompts_dir, test_files
+@pytest.fixture
+def mock_management_env(fs, cli_patches):
+    """Fixture to set up a mock environment for management commands."""
+    # Create the test prompts in a fake config directory
+    test_files = {}
+    for relative_path, content in TEST_PROMPTS.items():
+        file_path = FAKE_PROMPTS_DIR / relative_path
+        fs.create_file(file_path, contents=content)
+        test_files[file_path] = content
 
+    return FAKE_CONFIG_DIR, FAKE_PROMPTS_DIR, test_files
 
-def test_list_command_basic(mock_management_env):
+
+def test_list_command_basic(runner, mock_management_env):
     """Test the basic functionality of the list command."""
     config_dir, prompts_dir, test_files = mock_management_env
 
-    runner = CliRunner()
     result = runner.invoke(
         cli, ["--project", "test-project", "--language", "python", "list"]
     )
@@ -111,7 +103,7 @@ def test_list_command_basic(mock_management_env):
     assert "A test fragment" in result.output
 
 
-def test_list_command_with_category_filter(mock_management_env):
+def test_list_command_with_category_filter(runner, mock_management_env):
     """Test the list command with category filtering."""
     config_dir, prompts_dir, test_files = mock_management_env
 
@@ -125,6 +117,7 @@ def test_list_command_with_category_filter(mock_management_env):
         use_dashes=True,
         inline_description=False,
         category_filter=None,
+        color=True,
     ):
         if category_filter == "test":
             # Only include fragments with test category
@@ -150,7 +143,6 @@ def test_list_command_with_category_filter(mock_management_env):
 """
 
     with patch("prompy.prompt_files.PromptFiles.help_text", mock_help_text):
-        runner = CliRunner()
         result = runner.invoke(
             cli,
             [
@@ -174,11 +166,10 @@ def test_list_command_with_category_filter(mock_management_env):
         )  # Should be excluded (doesn't have 'test' category)
 
 
-def test_list_command_simple_format(mock_management_env):
+def test_list_command_simple_format(runner, mock_management_env):
     """Test the list command with simple format."""
     config_dir, prompts_dir, test_files = mock_management_env
 
-    runner = CliRunner()
     result = runner.invoke(
         cli,
         [
@@ -199,185 +190,64 @@ def test_list_command_simple_format(mock_management_env):
     assert "test-fragment" in result.output
 
 
-def test_mv_command(mock_management_env):
-    """Test the mv command."""
+@pytest.mark.parametrize(
+    "options,destination,confirm,moved",
+    [
+        ([], "renamed-fragment", True, True),
+        ([], "another-fragment", False, False),
+        ([], "another-fragment", True, True),
+        (["--force"], "another-fragment", False, True),
+    ],
+    ids=["new-destination", "overwrite-cancelled", "overwrite-confirmed", "force"],
+)
+def test_mv_command(
+    runner, monkeypatch, mock_management_env, options, destination, confirm, moved
+):
+    """Test the mv command, confirming or cancelling an overwrite, or forcing it."""
     config_dir, prompts_dir, test_files = mock_management_env
 
-    # Create a mock confirm that always returns True
-    with patch("click.confirm", return_value=True):
-        runner = CliRunner()
-        # Move a fragment to a new location
-        result = runner.invoke(
-            cli,
-            [
-                "--project",
-                "test-project",
-                "--language",
-                "python",
-                "mv",
-                "test-fragment",
-                "renamed-fragment",
-            ],
-        )
+    # With --force, the answer to the confirmation is never asked for
+    monkeypatch.setattr("click.confirm", lambda *args, **kwargs: confirm)
+    result = runner.invoke(
+        cli, [*CLI_OPTIONS, "mv", *options, "test-fragment", destination]
+    )
 
+    if moved:
         assert result.exit_code == 0
-        assert "Moved 'test-fragment' to 'renamed-fragment'" in result.output
-
-        # Verify the file was moved
-        source_path = prompts_dir / "fragments" / "test-fragment.md"
-        dest_path = prompts_dir / "fragments" / "renamed-fragment.md"
-        assert not source_path.exists()
-        assert dest_path.exists()
-
-
-def test_mv_command_existing_destination(mock_management_env):
-    """Test the mv command with an existing destination."""
-    config_dir, prompts_dir, test_files = mock_management_env
-
-    # First mock confirm to return False (cancel the operation)
-    with patch("click.confirm", return_value=False):
-        runner = CliRunner()
-        result = runner.invoke(
-            cli,
-            [
-                "--project",
-                "test-project",
-                "--language",
-                "python",
-                "mv",
-                "test-fragment",
-                "another-fragment",  # Destination exists
-            ],
-        )
-
+        assert f"Moved 'test-fragment' to '{destination}'" in result.output
+    else:
         assert result.exit_code == 1  # Operation canceled should return error code
         assert "Move operation aborted" in result.output
         assert "💡 Suggestion:" in result.output
         assert "--force" in result.output
 
-        # Both files should still exist
-        source_path = prompts_dir / "fragments" / "test-fragment.md"
-        dest_path = prompts_dir / "fragments" / "another-fragment.md"
-        assert source_path.exists()
-        assert dest_path.exists()
-
-    # Now mock confirm to return True (proceed with overwrite)
-    with patch("click.confirm", return_value=True):
-        runner = CliRunner()
-        result = runner.invoke(
-            cli,
-            [
-                "--project",
-                "test-project",
-                "--language",
-                "python",
-                "mv",
-                "test-fragment",
-                "another-fragment",  # Destination exists
-            ],
-        )
-
-        assert result.exit_code == 0
-        assert "Moved 'test-fragment' to 'another-fragment'" in result.output
-
-        # Source file should be gone, destination should exist
-        source_path = prompts_dir / "fragments" / "test-fragment.md"
-        dest_path = prompts_dir / "fragments" / "another-fragment.md"
-        assert not source_path.exists()
-        assert dest_path.exists()
-
-
-def test_mv_command_force_flag(mock_management_env):
-    """Test the mv command with the force flag."""
-    config_dir, prompts_dir, test_files = mock_management_env
-
-    # With --force flag, no confirmation should be needed
-    runner = CliRunner()
-    result = runner.invoke(
-        cli,
-        [
-            "--project",
-            "test-project",
-            "--language",
-            "python",
-            "mv",
-            "--force",
-            "test-fragment",
-            "another-fragment",  # Force overwrite
-        ],
-    )
-
-    assert result.exit_code == 0
-    assert "Moved 'test-fragment' to 'another-fragment'" in result.output
-
-    # Source file should be gone, destination should exist
+    # The source is only gone if it was moved; the destination exists either way
     source_path = prompts_dir / "fragments" / "test-fragment.md"
-    dest_path = prompts_dir / "fragments" / "another-fragment.md"
-    assert not source_path.exists()
+    dest_path = prompts_dir / "fragments" / f"{destination}.md"
+    assert source_path.exists() != moved
     assert dest_path.exists()
 
 
-def test_mv_command_updates_references(mock_management_env):
+def test_mv_command_updates_references(runner, mock_management_env, confirm_yes):
     """Test that the mv command updates references in other prompt files."""
     config_dir, prompts_dir, test_files = mock_management_env
 
     # First, create a file with references to another fragment
     ref_file_path = prompts_dir / "fragments" / "with-references.md"
-    with open(ref_file_path, "w") as f:
-        f.write(
-            """---
+    ref_file_path.write_text(
+        """---
 description: File with references
 ---
 This is a test file with references to @test-fragment.
 Another reference: @test-fragment(arg1, key="value").
 """
-        )  # Mock the update_references function and click.confirm
-        with (
-            patch("prompy.cli.update_references") as mock_update,
-            patch("click.confirm", return_value=True),
-        ):
-            # Set up the mock to return data indicating success
-            mock_update.return_value = {str(ref_file_path): True}
-
-            runner = CliRunner()
-            result = runner.invoke(
-                cli,
-                [
-                    "--project",
-                    "test-project",
-                    "--language",
-                    "python",
-                    "mv",
-                    "test-fragment",
-                    "renamed-fragment",
-                ],
-                catch_exceptions=False,
-            )
-
-        assert result.exit_code == 0
-        assert "Moved 'test-fragment' to 'renamed-fragment'" in result.output
-        assert "✨ Updated references in 1 file(s)" in result.output
-
-        # Verify the mock was called correctly
-        mock_update.assert_called_once()
-        args = mock_update.call_args[0]
-        assert args[1] == "test-fragment"  # old slug
-        assert args[2] == "renamed-fragment"  # new slug
-
-
-def test_mv_command_no_references(mock_management_env):
-    """Test the mv command when there are no references to update."""
-    config_dir, prompts_dir, test_files = mock_management_env
+    )
 
-    # Mock the update_references function and click.confirm
-    with (
-        patch("prompy.cli.update_references") as mock_update,
-        patch("click.confirm", return_value=True),
-    ):
-        # Set up the mock to return data indicating no updates
-        mock_update.return_value = {}
+    # Mock the update_references function
+    with patch("prompy.cli.update_references") as mock_update:
+        # Set up the mock to return data indicating success
+        mock_update.return_value = {str(ref_file_path): True}
 
-        runner = CliRunner()
         result = runner.invoke(
             cli,
             [
@@ -389,20 +259,29 @@ def test_mv_command_no_references(mock_management_env):
                 "test-fragment",
                 "renamed-fragment",
             ],
+            catch_exceptions=False,
         )
 
-        assert result.exit_code == 0
-        assert "Moved 'test-fragment' to 'renamed-fragment'" in result.output
-        assert "✨ No references to update" in result.output
+    assert result.exit_code == 0
+    assert "Moved 'test-fragment' to 'renamed-fragment'" in result.output
+    assert "✨ Updated references in 1 file(s)" in result.output
+
+    # Verify the mock was called correctly
+    mock_update.assert_called_once()
+    args = mock_update.call_args[0]
+    assert args[1] == "test-fragment"  # old slug
+    assert args[2] == "renamed-fragment"  # new slug
 
 
-def test_rm_command(mock_management_env):
-    """Test the rm command."""
+def test_mv_command_no_references(runner, mock_management_env, confirm_yes):
+    """Test the mv command when there are no references to update."""
     config_dir, prompts_dir, test_files = mock_management_env
 
-    # Create a mock confirm that returns True
-    with patch("click.confirm", return_value=True):
-        runner = CliRunner()
+    # Mock the update_references function
+    with patch("prompy.cli.update_references") as mock_update:
+        # Set up the mock to return data indicating no updates
+        mock_update.return_value = {}
+
         result = runner.invoke(
             cli,
             [
@@ -410,53 +289,54 @@ def test_rm_command(mock_management_env):
                 "test-project",
                 "--language",
                 "python",
-                "rm",
+                "mv",
                 "test-fragment",
+                "renamed-fragment",
             ],
         )
 
         assert result.exit_code == 0
-        assert "Removed 'test-fragment'" in result.output
-
-        # Verify the file was removed
-        file_path = prompts_dir / "fragments" / "test-fragment.md"
-        assert not file_path.exists()
+        assert "Moved 'test-fragment' to 'renamed-fragment'" in result.output
+        assert "✨ No references to update" in result.output
 
 
-def test_rm_command_cancel(mock_management_env):
-    """Test cancelling the rm command."""
+@pytest.mark.parametrize(
+    "options,confirm,removed",
+    [
+        ([], True, True),
+        ([], False, False),
+        (["--force"], False, True),
+    ],
+    ids=["confirmed", "cancelled", "force"],
+)
+def test_rm_command(
+    runner, monkeypatch, mock_management_env, options, confirm, removed
+):
+    """Test the rm command, confirmed, cancelled, or forced."""
     config_dir, prompts_dir, test_files = mock_management_env
 
-    # Create a mock confirm that returns False
-    with patch("click.confirm", return_value=False):
-        runner = CliRunner()
-        result = runner.invoke(
-            cli,
-            [
-                "--project",
-                "test-project",
-                "--language",
-                "python",
-                "rm",
-                "test-fragment",
-            ],
-        )
+    # With --force, the answer to the confirmation is never asked for
+    monkeypatch.setattr("click.confirm", lambda *args, **kwargs: confirm)
+    result = runner.invoke(cli, [*CLI_OPTIONS, "rm", *options, "test-fragment"])
 
+    if removed:
+        assert result.exit_code == 0
+        assert "Removed 'test-fragment'" in result.output
+    else:
         assert result.exit_code == 1  # Operation canceled should return error code
         assert "Remove operation aborted" in result.output
         assert "💡 Suggestion:" in result.output
         assert "--force" in result.output
 
-        # Verify the file still exists
-        file_path = prompts_dir / "fragments" / "test-fragment.md"
-        assert file_path.exists()
+    # The file is only left in place if the removal was cancelled
+    file_path = prompts_dir / "fragments" / "test-fragment.md"
+    assert file_path.exists() != removed
 
 
-def test_rm_command_force(mock_management_env):
-    """Test the rm command with force flag."""
+def test_cp_command(runner, mock_management_env, confirm_yes):
+    """Test the cp command."""
     config_dir, prompts_dir, test_files = mock_management_env
 
-    runner = CliRunner()
     result = runner.invoke(
         cli,
         [
@@ -464,40 +344,12 @@ def test_rm_command_force(mock_management_env):
             "test-project",
             "--language",
             "python",
-            "rm",
-            "--force",
-            "test-fragment",  # No confirmation needed
+            "cp",
+            "test-fragment",
+            "copied-fragment",
         ],
     )
 
-    assert result.exit_code == 0
-    assert "Removed 'test-fragment'" in result.output
-
-    # Verify the file was removed
-    file_path = prompts_dir / "fragments" / "test-fragment.md"
-    assert not file_path.exists()
-
-
-def test_cp_command(mock_management_env):
-    """Test the cp command."""
-    config_dir, prompts_dir, test_files = mock_management_env
-
-    # Mock click.confirm to handle any confirmations
-    with patch("click.confirm", return_value=True):
-        runner = CliRunner()
-        result = runner.invoke(
-            cli,
-            [
-                "--project",
-                "test-project",
-                "--language",
-                "python",
-                "cp",
-                "test-fragment",
-                "copied-fragment",
-            ],
-        )
-
     assert result.exit_code == 0
     assert "Copied 'test-fragment' to 'copied-fragment'" in result.output
 
@@ -508,10 +360,8 @@ def test_cp_command(mock_management_env):
     assert dest_path.exists()
 
     # Verify content was copied correctly
-    with open(source_path) as f:
-        source_content = f.read().strip()
-    with open(dest_path) as f:
-        dest_content = f.read().strip()
+    source_content = source_path.read_text().strip()
+    dest_content = dest_path.read_text().strip()
 
     # Extract just the content part after frontmatter
     source_parts = source_content.split("---", 2)
@@ -2,207 +2,204 @@
 Tests for CLI output commands.
 """
 
-import os
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
 
 import click
 import pytest
-from click.testing import CliRunner
 
 from prompy.cli import cli
+from prompy.prompt_file import PromptFile
 
+TEST_CONTENT = "This is test prompt content.\n\nIt has multiple lines.\n"
 
-def mock_clipboard_output(*args, **kwargs):
-    """Mock function that simulates clipboard output behavior."""
-    click.echo("Prompt copied to clipboard.")
-    return True
 
+def fake_output(monkeypatch, name, succeed=True, message=""):
+    """
+    Replace prompy.output.<name> with a stub that records its arguments.
 
-def mock_file_output(content, file_path):
-    """Mock function that simulates file output behavior."""
-    click.echo(f"Prompt output to file: {file_path}")
-    return True
+    Returns the list of recorded argument tuples.
+    """
+    calls = []
 
+    def output(*args):
+        calls.append(args)
+        if succeed:
+            click.echo(message)
+        return succeed
 
-@pytest.fixture
-def mock_output_env(tmp_path, monkeypatch):
-    """Fixture to set up a mock output environment."""
-    # Create cache directories
-    cache_dir = tmp_path / "cache"
-    cache_dir.mkdir()
-
-    # Create a project cache dir
-    project_cache_dir = cache_dir / "test-project"
-    project_cache_dir.mkdir()
-
-    # Create a test cache file
-    cache_file = project_cache_dir / "CURRENT_FILE.md"
-    test_content = "This is test prompt content.\n\nIt has multiple lines.\n"
-    with open(cache_file, "w", encoding="utf-8") as f:
-        f.write(test_content)
-
-    # Mock the ensure_config_dirs function
-    with (
-        patch(
-            "prompy.cli.ensure_config_dirs",
-            return_value=(
-                tmp_path,
-                tmp_path / "prompts",
-                cache_dir,
-                tmp_path / "detections.yaml",
-            ),
-        ) as mock_config,
-        patch(
-            "prompy.prompt_render.PromptRender.render", return_value=test_content
-        ) as mock_render,
-        patch.dict(os.environ, {"EDITOR": "nano"}),
-    ):
-        yield mock_config, mock_render, cache_dir, test_content
-
-
-def test_out_command_to_stdout(mock_output_env):
+    monkeypatch.setattr(f"prompy.output.{name}", output)
+    return calls
+
+
+def config_dirs_in(directory):
+    """Return a stand-in for ensure_config_dirs with everything under directory."""
+    config_dirs = (
+        directory,
+        directory / "prompts",
+        directory / "cache",
+        directory / "detections.yaml",
+    )
+    return lambda: config_dirs
+
+
+@pytest.fixture(scope="module")
+def mock_output_env(tmp_path_factory):
+    """
+    Set up the cache and patches once for the module.
+
+    PromptRender.render always returns the cached content; tests that need
+    something else override it with monkeypatch. Tests must not change the
+    cache file.
+    """
+    config_dir = tmp_path_factory.mktemp("output")
+
+    # Create a test cache file in a project cache dir
+    cache_dir = config_dir / "cache"
+    cache_file = cache_dir / "test-project" / "CURRENT_FILE.md"
+    cache_file.parent.mkdir(parents=True)
+    cache_file.write_text(TEST_CONTENT, encoding="utf-8")
+
+    with pytest.MonkeyPatch.context() as mp:
+        # Run from an empty directory, so no project or language is detected
+        mp.chdir(config_dir)
+        mp.setattr("prompy.cli.ensure_config_dirs", config_dirs_in(config_dir))
+        mp.setattr(
+            "prompy.prompt_render.PromptRender.render",
+            lambda self, *args, **kwargs: TEST_CONTENT,
+        )
+        yield cache_dir, TEST_CONTENT
+
+
+def test_out_command_to_stdout(runner, mock_output_env):
     """Test the out command outputting to stdout."""
-    mock_config, mock_render, cache_dir, test_content = mock_output_env
-    runner = CliRunner()
+    cache_dir, test_content = mock_output_env
 
-    with runner.isolated_filesystem():
-        result = runner.invoke(cli, ["--project", "test-project", "out"])
+    result = runner.invoke(cli, ["--project", "test-project", "out"])
 
-        assert result.exit_code == 0
-        assert "This is test prompt content" in result.output
+    assert result.exit_code == 0
+    assert "This is test prompt content" in result.output
 
 
-def test_out_command_to_file(mock_output_env):
+def test_out_command_to_file(runner, mock_output_env, monkeypatch):
     """Test the out command outputting to a file."""
-    mock_config, mock_render, cache_dir, test_content = mock_output_env
-    runner = CliRunner()
+    cache_dir, test_content = mock_output_env
 
-    with runner.isolated_filesystem():
-        output_file = "output.md"
+    output_file = "output.md"
+    calls = fake_output(
+        monkeypatch, "output_to_file", message=f"Prompt output to file: {output_file}"
+    )
 
-        with patch(
-            "prompy.output.output_to_file", side_effect=mock_file_output
-        ) as mock_file:
-            result = runner.invoke(
-                cli, ["--project", "test-project", "out", "--file", output_file]
-            )
+    result = runner.invoke(
+        cli, ["--project", "test-project", "out", "--file", output_file]
+    )
 
-            assert result.exit_code == 0
-            assert f"Prompt output to file: {output_file}" in result.output
-            mock_file.assert_called_once_with(test_content, output_file)
+    assert result.exit_code == 0
+    assert f"Prompt output to file: {output_file}" in result.output
+    assert calls == [(test_content, output_file)]
 
 
-def test_out_command_to_clipboard(mock_output_env):
+def test_out_command_to_clipboard(runner, mock_output_env, monkeypatch):
     """Test the out command outputting to clipboard."""
-    mock_config, mock_render, cache_dir, test_content = mock_output_env
-    runner = CliRunner()
+    cache_dir, test_content = mock_output_env
+
+    calls = fake_output(
+        monkeypatch, "output_to_clipboard", message="Prompt copied to clipboard."
+    )
 
-    with runner.isolated_filesystem():
-        with patch(
-            "prompy.output.output_to_clipboard", side_effect=mock_clipboard_output
-        ) as mock_clipboard:
-            result = runner.invoke(
-                cli, ["--project", "test-project", "out", "--pbcopy"]
-            )
+    result = runner.invoke(cli, ["--project", "test-project", "out", "--pbcopy"])
 
-            assert result.exit_code == 0
-            assert "Prompt copied to clipboard." in result.output
-            mock_clipboard.assert_called_once_with(test_content)
+    assert result.exit_code == 0
+    assert "Prompt copied to clipboard." in result.output
+    assert calls == [(test_content,)]
 
 
-def test_out_command_no_project(mock_output_env):
+def test_out_command_no_project(runner, mock_output_env):
     """Test the out command with no project specified."""
-    mock_config, mock_render, cache_dir, test_content = mock_output_env
-    runner = CliRunner()
+    cache_dir, test_content = mock_output_env
 
-    with runner.isolated_filesystem():
-        # Run without --project flag
-        result = runner.invoke(cli, ["out"])
+    # Run without --project flag
+    result = runner.invoke(cli, ["out"])
 
-        assert result.exit_code == 1  # Error exit code
-        assert "Error: No project detected" in result.output
-        assert "💡 Suggestion:" in result.output
-        assert "Specify a project with --project" in result.output
-        assert "run prompy in a project directory" in result.output
+    assert result.exit_code == 1  # Error exit code
+    assert "Error: No project detected" in result.output
+    assert "💡 Suggestion:" in result.output
+    assert "Specify a project with --project" in result.output
+    assert "run prompy in a project directory" in result.output
 
 
-def test_out_command_no_cache(mock_output_env):
+def test_out_command_no_cache(runner, mock_output_env, monkeypatch, tmp_path):
     """Test the out command with no cache file."""
-    mock_config, mock_render, cache_dir, test_content = mock_output_env
-    runner = CliRunner()
 
-    # Remove the cache file
-    cache_file = cache_dir / "test-project" / "CURRENT_FILE.md"
-    if cache_file.exists():
-        os.unlink(cache_file)
+    # Use an empty cache, leaving the shared cache file in place
+    monkeypatch.setattr("prompy.cli.ensure_config_dirs", config_dirs_in(tmp_path))
 
-    with runner.isolated_filesystem():
-        result = runner.invoke(cli, ["--project", "test-project", "out"])
+    result = runner.invoke(cli, ["--project", "test-project", "out"])
 
-        assert result.exit_code == 1  # Error exit code
-        assert "No current prompt found" in result.output
-        assert (
-            "Try specifying a prompt slug or providing content via stdin"
-            in result.output
-        )
+    assert result.exit_code == 1  # Error exit code
+    assert "No current prompt found" in result.output
+    assert (
+        "Try specifying a prompt slug or providing content via stdin" in result.output
+    )
 
 
-def test_pbcopy_command(mock_output_env):
+def test_pbcopy_command(runner, mock_output_env, monkeypatch):
     """Test the pbcopy command."""
-    mock_config, mock_render, cache_dir, test_content = mock_output_env
-    runner = CliRunner()
+    cache_dir, test_content = mock_output_env
+
+    calls = fake_output(
+        monkeypatch, "output_to_clipboard", message="Prompt copied to clipboard."
+    )
 
-    with runner.isolated_filesystem():
-        with patch(
-            "prompy.output.output_to_clipboard", side_effect=mock_clipboard_output
-        ) as mock_clipboard:
-            result = runner.invoke(cli, ["--project", "test-project", "pbcopy"])
+    result = runner.invoke(cli, ["--project", "test-project", "pbcopy"])
 
-            assert result.exit_code == 0
-            assert "Prompt copied to clipboard." in result.output
-            mock_clipboard.assert_called_once_with(test_content)
+    assert result.exit_code == 0
+    assert "Prompt copied to clipboard." in result.output
+    assert calls == [(test_content,)]
 
 
-def test_pbcopy_command_with_slug(mock_output_env):
+@pytest.fixture
+def pbcopy_slug_env(mock_output_env, monkeypatch):
+    """
+    Load and render any slug to fixed content, recording what happens.
+
+    Returns a namespace with the loaded slugs and the clipboard calls.
+    """
+    env = SimpleNamespace(loaded_slugs=[])
+
+    def load_slug(self, slug, *args, **kwargs):
+        env.loaded_slugs.append(slug)
+        return PromptFile(slug=slug, markdown_template="Mock prompt content")
+
+    monkeypatch.setattr("prompy.prompt_context.PromptContext.load_slug", load_slug)
+    monkeypatch.setattr(
+        "prompy.prompt_render.PromptRender.render",
+        lambda self, *args, **kwargs: "Rendered content",
+    )
+    env.clipboard_calls = fake_output(
+        monkeypatch, "output_to_clipboard", message="Prompt copied to clipboard."
+    )
+    return env
+
+
+def test_pbcopy_command_with_slug(runner, pbcopy_slug_env):
     """Test the pbcopy command with a prompt slug."""
-    mock_config, mock_render, cache_dir, test_content = mock_output_env
-    runner = CliRunner()
-
-    with (
-        runner.isolated_filesystem(),
-        patch("prompy.prompt_context.PromptContext.load_slug") as mock_load_slug,
-        patch(
-            "prompy.output.output_to_clipboard", side_effect=mock_clipboard_output
-        ) as mock_clipboard,
-    ):
-        # Create a mock prompt file
-        mock_prompt = MagicMock()
-        mock_prompt.markdown_template = "Mock prompt content"
-        mock_load_slug.return_value = mock_prompt
-
-        # Mock the render method to return expected content
-        mock_render.return_value = "Rendered content"
-
-        result = runner.invoke(
-            cli, ["--project", "test-project", "pbcopy", "some/slug"]
-        )
+    result = runner.invoke(cli, ["--project", "test-project", "pbcopy", "some/slug"])
 
-        assert result.exit_code == 0
-        assert "Prompt copied to clipboard." in result.output
+    assert result.exit_code == 0
+    assert "Prompt copied to clipboard." in result.output
+    assert pbcopy_slug_env.loaded_slugs == ["some/slug"]
+    assert pbcopy_slug_env.clipboard_calls == [("Rendered content",)]
 
 
-def test_pbcopy_command_with_clipboard_error(mock_output_env):
+def test_pbcopy_command_with_clipboard_error(runner, mock_output_env, monkeypatch):
     """Test the pbcopy command when clipboard access fails."""
-    mock_config, mock_render, cache_dir, test_content = mock_output_env
-    runner = CliRunner()
-
-    with runner.isolated_filesystem():
-        with patch(
-            "prompy.output.output_to_clipboard", return_value=False
-        ) as mock_clipboard:
-            result = runner.invoke(cli, ["--project", "test-project", "pbcopy"])
-
-            assert result.exit_code == 1  # Should exit with error
-            assert "Failed to copy to clipboard" in result.output
-            assert "Make sure your system clipboard is accessible" in result.output
-            mock_clipboard.assert_called_once_with(test_content)
+    cache_dir, test_content = mock_output_env
+
+    calls = fake_output(monkeypatch, "output_to_clipboard", succeed=False)
+
+    result = runner.invoke(cli, ["--project", "test-project", "pbcopy"])
+
+    assert result.exit_code == 1  # Should exit with error
+    assert "Failed to copy to clipboard" in result.output
+    assert "Make sure your system clipboard is accessible" in result.output
+    assert calls == [(test_content,)]
@@ -2,123 +2,134 @@
 Tests for the save command functionality.
 """
 
-import os
-import tempfile
-from pathlib import Path
-from unittest.mock import patch
+import shutil
 
 import pytest
-from click.testing import CliRunner
 
 from prompy.cli import cli
 from prompy.prompt_file import PromptFile
 
+# The current prompt in the test project's cache
+TEST_CONTENT = (
+    "This is a test cache content.\n\nIt includes multiple paragraphs.\n\n"
+    "It should be saved as a prompt."
+)
+
+
+@pytest.fixture(scope="session")
+def cache_template(tmp_path_factory):
+    """A cache directory holding the test project's current prompt, built once."""
+    cache_dir = tmp_path_factory.mktemp("save_cache_template")
+    cache_file = cache_dir / "test-project" / "CURRENT_FILE.md"
+    cache_file.parent.mkdir()
+    cache_file.write_text(TEST_CONTENT, encoding="utf-8")
+    return cache_dir
+
 
 @pytest.fixture
-def mock_save_env():
+def mock_save_env(tmp_path, monkeypatch, cache_template):
     """Set up a mock environment for testing save command."""
-    # Create a temp directory for cache
-    with tempfile.TemporaryDirectory() as tmpdir:
-        cache_dir = Path(tmpdir) / "cache"
-        config_dir = Path(tmpdir) / "config"
-        prompts_dir = config_dir / "prompts"
-        projects_dir = prompts_dir / "projects"
-        fragments_dir = prompts_dir / "fragments"
-
-        # Set up needed directories
-        projects_dir.mkdir(parents=True, exist_ok=True)
-        fragments_dir.mkdir(parents=True, exist_ok=True)
-        cache_dir.mkdir(parents=True, exist_ok=True)
-
-        # Create a test cache file
-        test_project_cache = cache_dir / "test-project"
-        test_project_cache.mkdir(exist_ok=True)
-        cache_file = test_project_cache / "CURRENT_FILE.md"
-
-        # Sample content for testing
-        test_content = (
-            "This is a test cache content.\n\nIt includes multiple paragraphs.\n\n"
-            "It should be saved as a prompt."
-        )
-        with open(cache_file, "w", encoding="utf-8") as f:
-            f.write(test_content)
-
-        with patch(
-            "prompy.cli.ensure_config_dirs",
-            return_value=(
-                config_dir,
-                prompts_dir,
-                cache_dir,
-                config_dir / "detections.yaml",
-            ),
-        ):
-            yield (
-                config_dir,
-                prompts_dir,
-                cache_dir,
-                projects_dir,
-                fragments_dir,
-                test_content,
-            )
-
-
-def test_save_command_basic(mock_save_env):
+    # Run from the temp directory, so no project or language is detected
+    monkeypatch.chdir(tmp_path)
+
+    cache_dir = tmp_path / "cache"
+    config_dir = tmp_path / "config"
+    prompts_dir = config_dir / "prompts"
+    projects_dir = prompts_dir / "projects"
+    fragments_dir = prompts_dir / "fragments"
+
+    # Set up needed directories, copying the cache so tests may change it
+    projects_dir.mkdir(parents=True)
+    fragments_dir.mkdir()
+    shutil.copytree(cache_template, cache_dir)
+
+    config_dirs = (
+        config_dir,
+        prompts_dir,
+        cache_dir,
+        config_dir / "detections.yaml",
+    )
+    monkeypatch.setattr("prompy.cli.ensure_config_dirs", lambda: config_dirs)
+    return (
+        config_dir,
+        prompts_dir,
+        cache_dir,
+        projects_dir,
+        fragments_dir,
+        TEST_CONTENT,
+    )
+
+
+def canned_frontmatter(content, description=None, categories=None):
+    """Stand-in for generate_frontmatter that doesn't analyze the content."""
+    return {
+        "description": description or "A test prompt",
+        "categories": categories or [],
+        "args": {},
+    }
+
+
+@pytest.fixture
+def stub_frontmatter(monkeypatch):
+    """
+    Use canned frontmatter for saved prompts.
+
+    Tests that check what is generated from the content use the real generator.
+    """
+    monkeypatch.setattr("prompy.frontmatter.generate_frontmatter", canned_frontmatter)
+
+
+def test_save_command_basic(runner, mock_save_env, stub_frontmatter):
     """Test basic save command functionality."""
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, test_content = (
         mock_save_env
     )
-    runner = CliRunner()
 
-    with runner.isolated_filesystem():
-        result = runner.invoke(
-            cli, ["--project", "test-project", "save", "test/new-prompt"]
-        )
+    result = runner.invoke(
+        cli, ["--project", "test-project", "save", "test/new-prompt"]
+    )
 
-        assert result.exit_code == 0
+    assert result.exit_code == 0
 
-        # Check that the prompt was saved in the correct location
-        saved_file = fragments_dir / "test" / "new-prompt.md"
-        assert saved_file.exists(), f"File not found at {saved_file}"
+    # Check that the prompt was saved in the correct location
+    saved_file = fragments_dir / "test" / "new-prompt.md"
+    assert saved_file.exists(), f"File not found at {saved_file}"
 
-        # Check that it contains the content from the cache
-        with open(saved_file, "r", encoding="utf-8") as f:
-            saved_content = f.read()
+    # Check that it contains the content from the cache
+    saved_content = saved_file.read_text(encoding="utf-8")
 
-        assert "---" in saved_content  # Check for frontmatter
-        assert test_content in saved_content  # Check content is preserved
+    assert "---" in saved_content  # Check for frontmatter
+    assert test_content in saved_content  # Check content is preserved
 
 
-def test_save_command_with_description(mock_save_env):
+def test_save_command_with_description(runner, mock_save_env, stub_frontmatter):
     """Test save command with description option."""
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, test_content = (
         mock_save_env
     )
-    runner = CliRunner()
 
-    with runner.isolated_filesystem():
-        result = runner.invoke(
-            cli,
-            [
-                "--project",
-                "test-project",
-                "save",
-                "test/new-prompt",
-                "--description",
-                "This is a custom description",
-            ],
-        )
+    result = runner.invoke(
+        cli,
+        [
+            "--project",
+            "test-project",
+            "save",
+            "test/new-prompt",
+            "--description",
+            "This is a custom description",
+        ],
+    )
 
-        assert result.exit_code == 0
+    assert result.exit_code == 0
 
-        # Check that the prompt was saved
-        saved_file = fragments_dir / "test" / "new-prompt.md"
-        assert saved_file.exists()
+    # Check that the prompt was saved
+    saved_file = fragments_dir / "test" / "new-prompt.md"
+    assert saved_file.exists()
 
-        # Check that it contains the custom description
-        with open(saved_file, "r", encoding="utf-8") as f:
-            saved_content = f.read()
+    # Check that it contains the custom description
+    saved_content = saved_file.read_text(encoding="utf-8")
 
-        assert "description: This is a custom description" in saved_content
+    assert "description: This is a custom description" in saved_content
 
 
 def test_save_command_with_categories(mock_save_env):
@@ -126,7 +137,6 @@ def test_save_command_with_categories(mock_save_env):
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, test_content = (
         mock_save_env
     )
-    runner = CliRunner()
 
     # Create the prompt file directly to test with categories
     from prompy.frontmatter import generate_frontmatter
@@ -154,58 +164,53 @@ def test_save_command_with_categories(mock_save_env):
     prompt_file.save(dest_path)
 
     # Check that it contains the categories
-    with open(dest_path, "r", encoding="utf-8") as f:
-        saved_content = f.read()
+    saved_content = dest_path.read_text(encoding="utf-8")
 
     assert "categories:" in saved_content
     assert "- test" in saved_content
     assert "- prompt" in saved_content
 
 
-def test_save_command_existing_prompt(mock_save_env):
+def test_save_command_existing_prompt(runner, mock_save_env, stub_frontmatter):
     """Test save command when the destination already exists."""
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, test_content = (
         mock_save_env
     )
-    runner = CliRunner()
 
     # First create an existing prompt at the destination
     dest_dir = fragments_dir / "test"
     dest_dir.mkdir(parents=True, exist_ok=True)
 
     existing_file = dest_dir / "existing-prompt.md"
-    with open(existing_file, "w", encoding="utf-8") as f:
-        f.write("---\ndescription: Existing prompt\n---\n\nExisting content")
+    existing_file.write_text(
+        "---\ndescription: Existing prompt\n---\n\nExisting content", encoding="utf-8"
+    )
 
-    with (
-        runner.isolated_filesystem(),
-        patch("click.confirm", return_value=True) as mock_confirm,
-    ):
-        # Try to save over the existing file
-        result = runner.invoke(
-            cli, ["--project", "test-project", "save", "test/existing-prompt"]
-        )
+    # Try to save over the existing file
+    result = runner.invoke(
+        cli,
+        ["--project", "test-project", "save", "test/existing-prompt"],
+        input="y\n",
+    )
 
-        # Check confirmation was asked
-        mock_confirm.assert_called_once()
+    # Check confirmation was asked
+    assert "Overwrite?" in result.output
 
-        # Check that the file was overwritten
-        assert result.exit_code == 0
-        assert existing_file.exists()
+    # Check that the file was overwritten
+    assert result.exit_code == 0
+    assert existing_file.exists()
 
-        with open(existing_file, "r", encoding="utf-8") as f:
-            new_content = f.read()
+    new_content = existing_file.read_text(encoding="utf-8")
 
-        assert test_content in new_content
-        assert "Existing content" not in new_content
+    assert test_content in new_content
+    assert "Existing content" not in new_content
 
 
-def test_save_command_existing_prompt_abort(mock_save_env):
+def test_save_command_existing_prompt_abort(runner, mock_save_env):
     """Test save command with abort when file exists."""
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, test_content = (
         mock_save_env
     )
-    runner = CliRunner()
 
     # First create an existing prompt at the destination
     dest_dir = fragments_dir / "test"
@@ -213,54 +218,47 @@ def test_save_command_existing_prompt_abort(mock_save_env):
 
     existing_file = dest_dir / "existing-prompt.md"
     existing_content = "---\ndescription: Existing prompt\n---\n\nExisting content"
-    with open(existing_file, "w", encoding="utf-8") as f:
-        f.write(existing_content)
+    existing_file.write_text(existing_content, encoding="utf-8")
 
-    with (
-        runner.isolated_filesystem(),
-        patch("click.confirm", return_value=False) as mock_confirm,
-    ):
-        # Try to save over the existing file but abort
-        result = runner.invoke(
-            cli, ["--project", "test-project", "save", "test/existing-prompt"]
-        )
+    # Try to save over the existing file but abort
+    result = runner.invoke(
+        cli,
+        ["--project", "test-project", "save", "test/existing-prompt"],
+        input="n\n",
+    )
 
-        # Check confirmation was asked
-        mock_confirm.assert_called_once()
+    # Check confirmation was asked
+    assert "Overwrite?" in result.output
 
-        # Check that the command was aborted
-        assert "aborted" in result.output.lower()
+    # Check that the command was aborted
+    assert "aborted" in result.output.lower()
 
-        # Verify file wasn't changed
-        with open(existing_file, "r", encoding="utf-8") as f:
-            unchanged_content = f.read()
+    # Verify file wasn't changed
+    unchanged_content = existing_file.read_text(encoding="utf-8")
 
-        assert unchanged_content == existing_content
+    assert unchanged_content == existing_content
 
 
-def test_save_command_with_project_slug(mock_save_env):
+def test_save_command_with_project_slug(runner, mock_save_env, stub_frontmatter):
     """Test save command with $project slug."""
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, test_content = (
         mock_save_env
     )
-    runner = CliRunner()
 
-    with runner.isolated_filesystem():
-        result = runner.invoke(
-            cli, ["--project", "test-project", "save", "project/new-prompt"]
-        )
+    result = runner.invoke(
+        cli, ["--project", "test-project", "save", "project/new-prompt"]
+    )
 
-        assert result.exit_code == 0
+    assert result.exit_code == 0
 
-        # Check that the prompt was saved in the project directory
-        saved_file = projects_dir / "test-project" / "new-prompt.md"
-        assert saved_file.exists(), f"File not found at {saved_file}"
+    # Check that the prompt was saved in the project directory
+    saved_file = projects_dir / "test-project" / "new-prompt.md"
+    assert saved_file.exists(), f"File not found at {saved_file}"
 
 
-def test_save_command_auto_generated_frontmatter(mock_save_env):
+def test_save_command_auto_generated_frontmatter(runner, mock_save_env):
     """Test save command auto-generates frontmatter from content."""
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, _ = mock_save_env
-    runner = CliRunner()
 
     # Create a more complex content with potential arguments
     complex_content = """This is a complex prompt with arguments.
@@ -273,58 +271,50 @@ This paragraph doesn't have any variables."""
     # Create the cache file with complex content
     test_project_cache = cache_dir / "test-project"
     cache_file = test_project_cache / "CURRENT_FILE.md"
-    with open(cache_file, "w", encoding="utf-8") as f:
-        f.write(complex_content)
+    cache_file.write_text(complex_content, encoding="utf-8")
 
-    with runner.isolated_filesystem():
-        result = runner.invoke(
-            cli, ["--project", "test-project", "save", "test/complex-prompt"]
-        )
+    result = runner.invoke(
+        cli, ["--project", "test-project", "save", "test/complex-prompt"]
+    )
 
-        assert result.exit_code == 0
+    assert result.exit_code == 0
 
-        # Check that the prompt was saved
-        saved_file = fragments_dir / "test" / "complex-prompt.md"
-        assert saved_file.exists()
+    # Check that the prompt was saved
+    saved_file = fragments_dir / "test" / "complex-prompt.md"
+    assert saved_file.exists()
 
-        # Verify the generated frontmatter includes detected arguments
-        with open(saved_file, "r", encoding="utf-8") as f:
-            saved_content = f.read()
+    # Verify the generated frontmatter includes detected arguments
+    saved_content = saved_file.read_text(encoding="utf-8")
 
-        assert "args:" in saved_content
-        assert "param1" in saved_content
-        assert "param2" in saved_content
+    assert "args:" in saved_content
+    assert "param1" in saved_content
+    assert "param2" in saved_content
 
 
-def test_save_command_no_cache(mock_save_env):
+def test_save_command_no_cache(runner, mock_save_env):
     """Test save command when cache file doesn't exist."""
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, _ = mock_save_env
-    runner = CliRunner()
 
     # Remove cache file
     test_project_cache = cache_dir / "test-project"
     cache_file = test_project_cache / "CURRENT_FILE.md"
-    if cache_file.exists():
-        os.unlink(cache_file)
+    cache_file.unlink()
 
-    with runner.isolated_filesystem():
-        result = runner.invoke(
-            cli, ["--project", "test-project", "save", "test/no-cache-prompt"]
-        )
+    result = runner.invoke(
+        cli, ["--project", "test-project", "save", "test/no-cache-prompt"]
+    )
 
-        assert result.exit_code != 0
-        assert "No current prompt found" in result.output
+    assert result.exit_code != 0
+    assert "No current prompt found" in result.output
 
 
-def test_save_command_no_project(mock_save_env):
+def test_save_command_no_project(runner, mock_save_env):
     """Test save command with no project specified."""
     config_dir, prompts_dir, cache_dir, projects_dir, fragments_dir, _ = mock_save_env
-    runner = CliRunner()
 
-    with runner.isolated_filesystem():
-        result = runner.invoke(cli, ["save", "test/no-project-prompt"])
+    result = runner.invoke(cli, ["save", "test/no-project-prompt"])
 
-        assert result.exit_code == 1  # Error exit code
-        assert "Error: No current prompt found" in result.output
-        assert "💡 Suggestion:" in result.output
-        assert "Create a new prompt with 'prompy new'" in result.output
+    assert result.exit_code == 1  # Error exit code
+    assert "Error: No current prompt found" in result.output
+    assert "💡 Suggestion:" in result.output
+    assert "Create a new prompt with 'prompy new'" in result.output
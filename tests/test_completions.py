@@ -3,7 +3,6 @@ Tests for shell completions functionality.
 """
 
 import pytest
-from click.testing import CliRunner
 
 from prompy.cli import cli
 from prompy.completions import get_completion_script, get_installation_instructions
@@ -53,29 +52,24 @@ def test_get_installation_instructions():
         get_installation_instructions("invalid")
 
 
-def test_completions_command(tmp_path):
-    """Test the completions command."""
-    runner = CliRunner()
-
-    # Test generating bash completion to stdout
-    result = runner.invoke(cli, ["completions", "bash"])
-    assert result.exit_code == 0
-    assert "_prompy_completion" in result.output
-    assert "To enable bash completion" in result.output
-
-    # Test generating zsh completion to stdout
-    result = runner.invoke(cli, ["completions", "zsh"])
+@pytest.mark.parametrize(
+    "shell,marker",
+    [
+        ("bash", "_prompy_completion"),
+        ("zsh", "#compdef prompy"),
+        ("fish", "__fish_prompy_complete"),
+    ],
+)
+def test_completions_command_stdout(runner, shell, marker):
+    """Test the completions command generating a script to stdout."""
+    result = runner.invoke(cli, ["completions", shell])
     assert result.exit_code == 0
-    assert "#compdef prompy" in result.output
-    assert "To enable zsh completion" in result.output
+    assert marker in result.output
+    assert f"To enable {shell} completion" in result.output
 
-    # Test generating fish completion to stdout
-    result = runner.invoke(cli, ["completions", "fish"])
-    assert result.exit_code == 0
-    assert "__fish_prompy_complete" in result.output
-    assert "To enable fish completion" in result.output
 
-    # Test generating completion script to file
+def test_completions_command_to_file(runner, tmp_path):
+    """Test the completions command writing a script to a file."""
     output_file = tmp_path / "prompy-complete.bash"
     result = runner.invoke(cli, ["completions", "bash", "-o", str(output_file)])
     assert result.exit_code == 0
@@ -86,7 +80,9 @@ def test_completions_command(tmp_path):
     content = output_file.read_text()
     assert "_prompy_completion" in content
 
-    # Test invalid shell
+
+def test_completions_command_invalid_shell(runner):
+    """Test the completions command with an unsupported shell."""
     result = runner.invoke(cli, ["completions", "invalid"])
     assert result.exit_code != 0
     assert "Error: Invalid value for '{bash|zsh|fish}'" in result.output
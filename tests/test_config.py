@@ -3,18 +3,19 @@ Tests for the config module.
 """
 
 import os
-import tempfile
 from pathlib import Path
 from unittest.mock import patch
 
 import yaml
 
 from prompy.config import (
+    clear_project_dir_cache,
     detect_language,
     ensure_config_dirs,
     find_project_dir,
     get_config_dir,
     get_default_detections,
+    load_detections,
 )
 
 
@@ -32,80 +33,110 @@ def test_get_config_dir_default():
         assert str(config_dir) == str(Path("~/.config/prompy").expanduser())
 
 
-def test_ensure_config_dirs():
+def test_ensure_config_dirs(fs):
     """Test ensuring all config directories exist."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
-        with patch("prompy.config.get_config_dir", return_value=tmpdir_path):
-            config_dir, prompts_dir, cache_dir, detections_file = ensure_config_dirs()
+    fake_config_dir = Path("/config/prompy")
+    with patch("prompy.config.get_config_dir", return_value=fake_config_dir):
+        config_dir, prompts_dir, cache_dir, detections_file = ensure_config_dirs()
 
-            assert config_dir.exists()
-            assert prompts_dir.exists()
-            assert cache_dir.exists()
-            assert detections_file.exists()
+    assert config_dir.exists()
+    assert prompts_dir.exists()
+    assert cache_dir.exists()
+    assert detections_file.exists()
 
-            assert (prompts_dir / "projects").exists()
-            assert (prompts_dir / "languages").exists()
-            assert (prompts_dir / "fragments").exists()
+    assert (prompts_dir / "projects").exists()
+    assert (prompts_dir / "languages").exists()
+    assert (prompts_dir / "fragments").exists()
 
-            # Check if detections file contains default content
-            with open(detections_file, "r") as f:
-                detections = yaml.safe_load(f)
-                assert "python" in detections
-                assert "file_patterns" in detections["python"]
+    # Check if detections file contains default content
+    detections = yaml.safe_load(detections_file.read_text())
+    assert "python" in detections
+    assert "file_patterns" in detections["python"]
 
 
-def test_find_project_dir():
+def test_find_project_dir(fs):
     """Test finding project directory."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
-
-        # Create a mock project structure
-        project_dir = tmpdir_path / "my-project"
-        project_dir.mkdir()
-        git_dir = project_dir / ".git"
-        git_dir.mkdir()
-
-        # Mock the current working directory
-        with patch("pathlib.Path.cwd", return_value=project_dir):
-            result = find_project_dir()
-            assert result is not None
-            assert result == project_dir
-            assert result.name == "my-project"
-
-        # Test with a subdirectory
-        subdir = project_dir / "src"
-        subdir.mkdir()
-        with patch("pathlib.Path.cwd", return_value=subdir):
-            result = find_project_dir()
-            assert result is not None
-            assert result == project_dir
-            assert result.name == "my-project"
-
-
-def test_detect_language():
+    # Create a mock project structure
+    project_dir = Path("/projects/my-project")
+    fs.create_dir(project_dir / ".git")
+    # Earlier tests may have searched these paths on the real filesystem
+    clear_project_dir_cache()
+
+    # Mock the current working directory
+    with patch("pathlib.Path.cwd", return_value=project_dir):
+        result = find_project_dir()
+        assert result is not None
+        assert result == project_dir
+        assert result.name == "my-project"
+
+    # Test with a subdirectory
+    subdir = project_dir / "src"
+    fs.create_dir(subdir)
+    with patch("pathlib.Path.cwd", return_value=subdir):
+        result = find_project_dir()
+        assert result is not None
+        assert result == project_dir
+        assert result.name == "my-project"
+
+
+def test_detect_language(fs):
     """Test language detection based on file patterns."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir_path = Path(tmpdir)
-
-        # Create a mock project with Python files
-        (tmpdir_path / "file.py").touch()
-        (tmpdir_path / "requirements.txt").touch()
-
-        # Create mock detections file
-        detections_file = tmpdir_path / "detections.yaml"
-        with open(detections_file, "w") as f:
-            yaml.dump(get_default_detections(), f)
-
-        with patch("prompy.config.get_config_dir", return_value=tmpdir_path):
-            language = detect_language(tmpdir_path)
-            assert language == "python"
-
-        # Test with JavaScript files
-        (tmpdir_path / "file.js").touch()
-        (tmpdir_path / "package.json").touch()
-
-        with patch("prompy.config.get_config_dir", return_value=tmpdir_path):
-            language = detect_language(tmpdir_path)
-            # Python still has more files, should still be detected as Python
-            assert language == "python"
+    project_dir = Path("/detect/project")
+
+    # Create a mock project with Python files
+    fs.create_file(project_dir / "file.py")
+    fs.create_file(project_dir / "requirements.txt")
+
+    # Create mock detections file
+    fs.create_file(
+        project_dir / "detections.yaml",
+        contents=yaml.dump(get_default_detections()),
+    )
+
+    with patch("prompy.config.get_config_dir", return_value=project_dir):
+        language = detect_language(project_dir)
+        assert language == "python"
+
+    # Test with JavaScript files
+    fs.create_file(project_dir / "file.js")
+    fs.create_file(project_dir / "package.json")
+
+    with patch("prompy.config.get_config_dir", return_value=project_dir):
+        language = detect_language(project_dir)
+        # Python still has more files, should still be detected as Python
+        assert language == "python"
+
+
+def test_load_detections(tmp_path):
+    """Test that detections are parsed once, and again when the file changes."""
+    detections_file = tmp_path / "detections.yaml"
+
+    # A missing file falls back to the defaults
+    assert load_detections(detections_file) == get_default_detections()
+
+    detections_file.write_text(yaml.dump({"python": {"file_patterns": ["*.py"]}}))
+    first = load_detections(detections_file)
+    assert first == {"python": {"file_patterns": ["*.py"]}}
+    assert load_detections(detections_file) is first
+
+    detections_file.write_text(yaml.dump({"go": {"file_patterns": ["*.go"]}}))
+    assert load_detections(detections_file) == {"go": {"file_patterns": ["*.go"]}}
+
+
+def test_find_project_dir_is_cached(tmp_path):
+    """Test that searches are cached by directory until the cache is cleared."""
+    project_dir = tmp_path / "my-project"
+    subdir = project_dir / "src" / "pkg"
+    subdir.mkdir(parents=True)
+    (project_dir / ".git").mkdir()
+
+    with patch("pathlib.Path.cwd", return_value=subdir):
+        assert find_project_dir() == project_dir
+
+        # A search from the same directory isn't repeated
+        (project_dir / ".git").rmdir()
+        assert find_project_dir() == project_dir
+
+        # Clearing the cache makes the next search look at the markers again
+        clear_project_dir_cache()
+        assert find_project_dir() != project_dir
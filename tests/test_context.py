@@ -7,49 +7,47 @@ from pathlib import Path
 from prompy.prompt_context import PromptContext
 
 
-def test_parse_prompt_slug_existence():
+def test_parse_prompt_slug_existence(fs):
     """Test that parse_prompt_slug with should_exist=True returns paths that exist."""
-    import tempfile
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_path = Path(tmpdir)
-
-        # Create necessary directories
-        fragments_dir = tmp_path / "fragments"
-        languages_dir = tmp_path / "languages" / "python"
-        projects_dir = tmp_path / "projects" / "test-project"
-
-        for dir_path in [fragments_dir, languages_dir, projects_dir]:
-            dir_path.mkdir(parents=True, exist_ok=True)
-
-        # Create some sample files
-        fragment_file = fragments_dir / "test.md"
-        language_file = languages_dir / "test.md"
-        project_file = projects_dir / "test.md"
-
-        for file_path, content in [
-            (fragment_file, "---\ndescription: Fragment test\n---\nFragment content"),
-            (language_file, "---\ndescription: Language test\n---\nLanguage content"),
-            (project_file, "---\ndescription: Project test\n---\nProject content"),
-        ]:
-            with open(file_path, "w") as f:
-                f.write(content)
-
-        # Create a PromptContext with the directories
-        context = PromptContext(
-            project_name="test-project",
-            language="python",
-            language_dirs=[languages_dir],
-            project_dirs=[projects_dir],
-            fragment_dirs=[fragments_dir],
-        )
-
-        # Load all available prompt files
-        prompt_files = context.load_all()
-
-        # For each file in the collection, ensure that parse_prompt_slug returns
-        # a path that exists
-        for slug in prompt_files.available_slugs():
-            path = context.parse_prompt_slug(slug, should_exist=True)
-            assert path is not None, f"Path for slug '{slug}' should not be None"
-            assert path.exists(), f"Path for slug '{slug}' should exist: {path}"
+    prompts_dir = Path("/prompts")
+
+    # The prompt directories
+    fragments_dir = prompts_dir / "fragments"
+    languages_dir = prompts_dir / "languages" / "python"
+    projects_dir = prompts_dir / "projects" / "test-project"
+
+    # Create some sample files, and their directories
+    for file_path, content in [
+        (
+            fragments_dir / "test.md",
+            "---\ndescription: Fragment test\n---\nFragment content",
+        ),
+        (
+            languages_dir / "test.md",
+            "---\ndescription: Language test\n---\nLanguage content",
+        ),
+        (
+            projects_dir / "test.md",
+            "---\ndescription: Project test\n---\nProject content",
+        ),
+    ]:
+        fs.create_file(file_path, contents=content)
+
+    # Create a PromptContext with the directories
+    context = PromptContext(
+        project_name="test-project",
+        language="python",
+        language_dirs=[languages_dir],
+        project_dirs=[projects_dir],
+        fragment_dirs=[fragments_dir],
+    )
+
+    # Load all available prompt files
+    prompt_files = context.load_all()
+
+    # For each file in the collection, ensure that parse_prompt_slug returns
+    # a path that exists
+    for slug in prompt_files.available_slugs():
+        path = context.parse_prompt_slug(slug, should_exist=True)
+        assert path is not None, f"Path for slug '{slug}' should not be None"
+        assert path.exists(), f"Path for slug '{slug}' should exist: {path}"
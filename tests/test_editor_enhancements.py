@@ -4,7 +4,8 @@ Tests for enhanced editor features.
 
 import os
 import tempfile
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import patch
 
 from prompy.editor import (
     clear_editor_help,
@@ -41,8 +42,7 @@ class TestTerminalDetection:
     def test_is_terminal_output_no_isatty(self):
         """Test handling when stdout has no isatty method."""
         # Mock stdout to not have isatty method
-        mock_stdout = MagicMock()
-        del mock_stdout.isatty  # Remove the isatty attribute
+        mock_stdout = SimpleNamespace()  # No isatty attribute
 
         with patch("sys.stdout", mock_stdout):
             # Should return False when no isatty method exists
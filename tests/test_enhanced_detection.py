@@ -120,6 +120,42 @@ def test_multifile_language_detection():
             assert detected == "typescript"
 
 
+def test_file_patterns_with_directories():
+    """Test that file patterns containing "/" match relative paths."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir_path = Path(tmpdir)
+
+        detection_rules = {
+            "python": {
+                "file_patterns": ["src/*.py"],
+                "dir_patterns": [],
+                "content_patterns": [],
+                "weight": 1.0,
+            },
+            "javascript": {
+                "file_patterns": ["*.js"],
+                "dir_patterns": [],
+                "content_patterns": [],
+                "weight": 1.0,
+            },
+        }
+
+        # Python files under src/ count; the one at the top level doesn't
+        (tmpdir_path / "pkg" / "src").mkdir(parents=True)
+        (tmpdir_path / "pkg" / "src" / "main.py").touch()
+        (tmpdir_path / "pkg" / "src" / "util.py").touch()
+        (tmpdir_path / "top.py").touch()
+        (tmpdir_path / "app.js").touch()
+
+        detections_file = tmpdir_path / "detections.yaml"
+        with open(detections_file, "w") as f:
+            yaml.dump(detection_rules, f)
+
+        with patch("prompy.config.get_config_dir", return_value=tmpdir_path):
+            detected = detect_language(tmpdir_path)
+            assert detected == "python"
+
+
 def test_project_markers():
     """Test project detection with various project markers."""
     from prompy.config import find_project_dir, get_project_markers
@@ -81,10 +81,10 @@ def test_nested_indentation():
 
     # Setup context
     mock_context = MagicMock(spec=PromptContext)
-    mock_context.load_slug.side_effect = lambda slug: {
+    mock_context.load_slug.side_effect = {
         "sublist1": sublist1_file,
         "sublist2": sublist2_file,
-    }[slug]
+    }.__getitem__
 
     # Create renderer
     renderer = PromptRender(main_file)
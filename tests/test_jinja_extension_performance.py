@@ -4,9 +4,7 @@ Test module for performance optimizations in the Jinja2 extension.
 
 from unittest.mock import MagicMock
 
-from jinja2 import Environment
-
-from prompy.jinja_extension import PrompyExtension, preprocess_template
+from prompy.jinja_extension import preprocess_template
 from prompy.prompt_context import PromptContext
 from prompy.prompt_file import PromptFile
 from prompy.prompt_render import PromptRender
@@ -97,7 +95,6 @@ def test_preprocessor_regex_performance(benchmark):
 
 def test_complex_fragment_resolution(benchmark):
     """Test performance of complex fragment resolution with nested references."""
-    env = Environment(extensions=[PrompyExtension])
     mock_context = MagicMock(spec=PromptContext)
 
     # Setup test fragments
@@ -128,8 +125,6 @@ def test_complex_fragment_resolution(benchmark):
         raise ValueError(f"Unknown fragment: {slug}")
 
     mock_context.load_slug.side_effect = mock_load_slug
-    env.globals["_prompy_context"] = mock_context
-    env.globals["_fragment_stack"] = []
 
     template = """
     {{ @fragment1(
@@ -154,7 +149,6 @@ def test_complex_fragment_resolution(benchmark):
 
 def test_deep_nested_fragment_performance(benchmark):
     """Test performance with deeply nested fragment references."""
-    env = Environment(extensions=[PrompyExtension])
     mock_context = MagicMock(spec=PromptContext)
 
     # Setup test fragments
@@ -197,8 +191,6 @@ def test_deep_nested_fragment_performance(benchmark):
         raise ValueError(f"Unknown fragment: {slug}")
 
     mock_context.load_slug.side_effect = mock_load_slug
-    env.globals["_prompy_context"] = mock_context
-    env.globals["_fragment_stack"] = []
 
     # Create a template with multiple levels of nesting
     template = """
@@ -225,3 +217,22 @@ def test_deep_nested_fragment_performance(benchmark):
     assert 'include_fragment("level4"' in result
     assert 'include_fragment("level2_alt"' in result
     assert 'include_fragment("level3_alt"' in result
+
+
+def test_reference_pattern_performance(benchmark):
+    """Test the performance of scanning a large template for references."""
+    from prompy.references import JINJA_FRAGMENT_REF_PATTERN
+
+    line = "Prose mentioning an @address. " * 20 + "{{ @fragments/one(x=1) }}\n"
+    template = line * 1000
+
+    def run_scan():
+        return [
+            match.group(1) for match in JINJA_FRAGMENT_REF_PATTERN.finditer(template)
+        ]
+
+    # Benchmark the scan
+    result = benchmark(run_scan)
+
+    # Bare @mentions outside {{ ... }} are not references
+    assert result == ["fragments/one"] * 1000
@@ -11,6 +11,15 @@ from unittest.mock import patch
 
 import pytest
 
+# Handle tomllib import for different Python versions, once at import
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    try:
+        import tomli as tomllib  # Python 3.9-3.10 fallback
+    except ImportError:
+        tomllib = None
+
 
 class TestPackageInstallation:
     """Test package installation and entry points."""
@@ -19,7 +28,7 @@ class TestPackageInstallation:
         """Test that the main entry point is properly configured."""
         # Test by importing directly without subprocess
         try:
-            import prompy.cli
+            import prompy.cli  # noqa: F401
 
             assert True  # If we get here, import worked
         except ImportError:
@@ -201,14 +210,8 @@ class TestBuildProcess:
 
     def test_pyproject_toml_valid(self):
         """Test that pyproject.toml is valid TOML."""
-        # Handle tomllib import for different Python versions
-        try:
-            import tomllib  # Python 3.11+
-        except ImportError:
-            try:
-                import tomli as tomllib  # Python 3.9-3.10 fallback
-            except ImportError:
-                pytest.skip("No TOML library available (tomllib or tomli)")
+        if tomllib is None:
+            pytest.skip("No TOML library available (tomllib or tomli)")
 
         pyproject_path = Path(__file__).parent.parent / "pyproject.toml"
 
@@ -225,14 +228,8 @@ class TestBuildProcess:
 
     def test_package_scripts_configuration(self):
         """Test that package scripts are properly configured."""
-        # Handle tomllib import for different Python versions
-        try:
-            import tomllib  # Python 3.11+
-        except ImportError:
-            try:
-                import tomli as tomllib  # Python 3.9-3.10 fallback
-            except ImportError:
-                pytest.skip("No TOML library available (tomllib or tomli)")
+        if tomllib is None:
+            pytest.skip("No TOML library available (tomllib or tomli)")
 
         pyproject_path = Path(__file__).parent.parent / "pyproject.toml"
 
@@ -4,6 +4,7 @@ Tests for prompt file functionality.
 
 import tempfile
 from pathlib import Path
+from unittest.mock import MagicMock
 
 import pytest
 
@@ -11,6 +12,7 @@ from prompy.error_handling import FragmentNotFoundError
 from prompy.prompt_context import PromptContext
 from prompy.prompt_file import PromptFile
 from prompy.prompt_files import PromptFiles
+from prompy.prompt_render import PromptRender
 
 
 def test_parse_frontmatter():
@@ -129,6 +131,37 @@ args:
         )
 
 
+def test_prompt_file_load_keeps_template_whitespace():
+    """Test that loading and saving keep the template exactly as written."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "padded.md"
+        path.write_text("---\ndescription: Padded\n---\n\n\n    Padded content\n\n")
+
+        prompt_file = PromptFile.load(path)
+        assert prompt_file.markdown_template == "    Padded content\n\n"
+        assert prompt_file.stripped_template == "Padded content"
+
+        prompt_file.save(path)
+        assert path.read_text().endswith("---\n\n    Padded content\n\n")
+
+
+def test_loaded_fragment_keeps_indentation():
+    """Test that a fragment loaded from disk renders without being stripped."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "frag.md"
+        path.write_text(
+            "---\nargs: {}\n---\n\n    indented first line\n    second\n\n\n"
+        )
+        fragment = PromptFile.load(path)
+
+        main_file = PromptFile(slug="main", markdown_template="Start:\n{{ @frag }}End")
+        mock_context = MagicMock(spec=PromptContext)
+        mock_context.load_slug.return_value = fragment
+
+        result = PromptRender(main_file).render(mock_context)
+        assert result == "Start:\n    indented first line\n    second\n\nEnd"
+
+
 def test_is_fragment():
     """Test is_fragment functionality."""
     # Test with no arguments (valid fragment)
@@ -147,6 +180,21 @@ def test_is_fragment():
     assert prompt_file.is_fragment() is True
 
 
+def test_category_set():
+    """Test the category set follows changes to categories."""
+    prompt_file = PromptFile(categories=["test", "example"])
+    assert prompt_file.category_set == frozenset({"test", "example"})
+
+    prompt_file.categories.append("more")
+    assert prompt_file.category_set == frozenset({"test", "example", "more"})
+
+    prompt_file.categories = ["other"]
+    assert prompt_file.category_set == frozenset({"other"})
+
+    prompt_file.categories = None
+    assert prompt_file.category_set == frozenset()
+
+
 def test_prompt_files_collection():
     """Test the PromptFiles collection."""
     # Create some test prompt files
@@ -186,6 +234,19 @@ def test_prompt_files_collection():
     assert "language/file3" in slugs
 
 
+def test_prompt_files_help_text_color():
+    """Test that help text only contains ANSI codes when color is requested."""
+    prompt_file = PromptFile(slug="test/file1", description="File 1 description")
+    collection = PromptFiles(fragments={prompt_file.slug: prompt_file})
+
+    plain = collection.help_text(color=False)
+    assert "test/file1" in plain
+    assert "File 1 description" in plain
+    assert "\x1b[" not in plain
+
+    assert "\x1b[" in collection.help_text(color=True)
+
+
 def test_prompt_context():
     """Test the PromptContext class."""
     with tempfile.TemporaryDirectory() as tmpdir:
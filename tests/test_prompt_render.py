@@ -2,7 +2,7 @@
 Tests for prompt_render.py.
 """
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -109,10 +109,10 @@ class TestPromptRender:
 
         # Mock context to return our fragments
         mock_context = MagicMock(spec=PromptContext)
-        mock_context.load_slug.side_effect = lambda slug: {
+        mock_context.load_slug.side_effect = {
             "fragment1": fragment1_file,
             "fragment2": fragment2_file,
-        }[slug]
+        }.__getitem__
 
         # Create renderer
         renderer = PromptRender(main_file)
@@ -146,10 +146,10 @@ class TestPromptRender:
 
         # Mock context to return our fragments
         mock_context = MagicMock(spec=PromptContext)
-        mock_context.load_slug.side_effect = lambda slug: {
+        mock_context.load_slug.side_effect = {
             "fragment1": fragment1_file,
             "fragment2": fragment2_file,
-        }[slug]
+        }.__getitem__
 
         # Create renderer
         renderer = PromptRender(main_file)
@@ -186,11 +186,11 @@ class TestPromptRender:
 
         # Mock context to return our fragments
         mock_context = MagicMock(spec=PromptContext)
-        mock_context.load_slug.side_effect = lambda slug: {
+        mock_context.load_slug.side_effect = {
             "main": main_file,
             "fragment1": fragment1_file,
             "fragment2": fragment2_file,
-        }[slug]
+        }.__getitem__
 
         # Create renderer
         renderer = PromptRender(main_file)
@@ -279,10 +279,10 @@ class TestPromptRender:
 
         # Mock context to return our fragments
         mock_context = MagicMock(spec=PromptContext)
-        mock_context.load_slug.side_effect = lambda slug: {
+        mock_context.load_slug.side_effect = {
             "outer": outer_file,
             "inner": inner_file,
-        }[slug]
+        }.__getitem__
 
         # Create renderer
         renderer = PromptRender(main_file)
@@ -315,10 +315,10 @@ class TestPromptRender:
 
         # Mock context to return our fragments
         mock_context = MagicMock(spec=PromptContext)
-        mock_context.load_slug.side_effect = lambda slug: {
+        mock_context.load_slug.side_effect = {
             "fragment1": fragment1_file,
             "fragment2": fragment2_file,
-        }[slug]
+        }.__getitem__
 
         # Create renderer
         renderer = PromptRender(main_file)
@@ -352,10 +352,10 @@ class TestPromptRender:
 
         # Mock context to return our fragments
         mock_context = MagicMock(spec=PromptContext)
-        mock_context.load_slug.side_effect = lambda slug: {
+        mock_context.load_slug.side_effect = {
             "fragment1": fragment1_file,
             "fragment2": fragment2_file,
-        }[slug]
+        }.__getitem__
 
         # Create renderer
         renderer = PromptRender(main_file)
@@ -389,10 +389,10 @@ class TestPromptRender:
 
         # Mock context to return our fragments
         mock_context = MagicMock(spec=PromptContext)
-        mock_context.load_slug.side_effect = lambda slug: {
+        mock_context.load_slug.side_effect = {
             "fragment1": fragment1_file,
             "fragment2": fragment2_file,
-        }[slug]
+        }.__getitem__
 
         # Create renderer
         renderer = PromptRender(main_file)
@@ -458,14 +458,14 @@ class TestPromptRender:
 
         # Mock context to return our fragments
         mock_context = MagicMock(spec=PromptContext)
-        mock_context.load_slug.side_effect = lambda slug: {
+        mock_context.load_slug.side_effect = {
             "fragment1": fragment1_file,
             "fragment2": fragment2_file,
             "fragment3": fragment3_file,
             "nested1": nested1_file,
             "nested2": nested2_file,
             "nested3": nested3_file,
-        }[slug]
+        }.__getitem__
 
         # Create renderer
         renderer = PromptRender(main_file)
@@ -514,3 +514,170 @@ class TestPromptRender:
         assert mock_context.load_slug.call_count == 1
         # The comma-separated string will be passed directly
         assert "Items: a,b,c" in result
+
+    def test_render_does_not_mutate_environment_globals(self):
+        """Test that per-render state is kept out of the environment globals."""
+        # Setup
+        main_file = PromptFile(slug="main", markdown_template="Main {{ @fragment }}")
+        fragment_file = PromptFile(
+            slug="fragment", markdown_template="fragment content", arguments={}
+        )
+
+        mock_context = MagicMock(spec=PromptContext)
+        mock_context.load_slug.return_value = fragment_file
+
+        renderer = PromptRender(main_file)
+        globals_before = dict(renderer.env.globals)
+
+        # Render
+        result = renderer.render(mock_context)
+
+        # Assert
+        assert result == "Main fragment content"
+        assert renderer.env.globals == globals_before
+        assert "_resolution_node" not in renderer.env.globals
+
+    def test_render_state_is_reset_after_render(self):
+        """Test that the per-render state does not outlive the render."""
+        from prompy.jinja_extension import render_state
+
+        main_file = PromptFile(slug="main", markdown_template="Main {{ @fragment }}")
+        mock_context = MagicMock(spec=PromptContext)
+        mock_context.load_slug.side_effect = FileNotFoundError("fragment")
+
+        with pytest.raises(ValueError):
+            PromptRender(main_file).render(mock_context)
+
+        assert render_state.get(None) is None
+
+    def test_repeated_fragment_is_loaded_once(self):
+        """Test that a fragment referenced several times is loaded once per render."""
+        # Setup
+        main_file = PromptFile(
+            slug="main",
+            markdown_template="{{ @shared }} {{ @wrapper }} {{ @shared }}",
+        )
+        wrapper_file = PromptFile(
+            slug="wrapper", markdown_template="[{{ @shared }}]", arguments={}
+        )
+        shared_file = PromptFile(slug="shared", markdown_template="S", arguments={})
+
+        mock_context = MagicMock(spec=PromptContext)
+        mock_context.load_slug.side_effect = {
+            "wrapper": wrapper_file,
+            "shared": shared_file,
+        }.__getitem__
+
+        # Render
+        result = PromptRender(main_file).render(mock_context)
+
+        # Assert
+        assert result == "S [S] S"
+        assert mock_context.load_slug.call_count == 2
+
+    def test_repeated_fragment_call_is_rendered_once(self):
+        """Test that identical fragment calls reuse the first rendering."""
+        from prompy.jinja_extension import PrompyExtension
+
+        # Setup
+        main_file = PromptFile(
+            slug="main",
+            markdown_template=(
+                '{{ @greet(name="a") }} {{ @greet(name="b") }} {{ @greet(name="a") }}'
+            ),
+        )
+        greet_file = PromptFile(
+            slug="greet", markdown_template="hi {{ name }}", arguments={"name": None}
+        )
+
+        mock_context = MagicMock(spec=PromptContext)
+        mock_context.load_slug.return_value = greet_file
+
+        # Render, counting how many times a fragment is prepared for rendering
+        prepare = PrompyExtension._prepare_template_context
+        with patch.object(
+            PrompyExtension,
+            "_prepare_template_context",
+            autospec=True,
+            side_effect=prepare,
+        ) as mock_prepare:
+            result = PromptRender(main_file).render(mock_context)
+
+        # Assert
+        assert result == "hi a hi b hi a"
+        assert mock_prepare.call_count == 2
+
+    def test_equal_arguments_of_different_types_render_separately(self):
+        """Test that 1, True and 1.0 are not treated as the same fragment call."""
+        # Setup
+        main_file = PromptFile(
+            slug="main",
+            markdown_template=(
+                "{{ @f(1) }} {{ @f(True) }} {{ @f(1.0) }} "
+                "{{ @f(x=1) }} {{ @f(x=True) }}"
+            ),
+        )
+        f_file = PromptFile(
+            slug="f", markdown_template="[{{ x }}]", arguments={"x": None}
+        )
+
+        mock_context = MagicMock(spec=PromptContext)
+        mock_context.load_slug.return_value = f_file
+
+        # Render
+        result = PromptRender(main_file).render(mock_context)
+
+        # Assert
+        assert result == "[1] [True] [1.0] [1] [True]"
+
+    def test_repeated_fragment_call_is_tracked_with_diagnostics(self):
+        """Test that every call of a fragment appears in the resolution tree."""
+        from prompy.diagnostics import DiagnosticsManager
+
+        main_file = PromptFile(
+            slug="main", markdown_template="{{ @wrapper }} {{ @wrapper }}"
+        )
+        wrapper_file = PromptFile(
+            slug="wrapper", markdown_template="[{{ @shared }}]", arguments={}
+        )
+        shared_file = PromptFile(slug="shared", markdown_template="S", arguments={})
+
+        mock_context = MagicMock(spec=PromptContext)
+        mock_context.load_slug.side_effect = {
+            "wrapper": wrapper_file,
+            "shared": shared_file,
+        }.__getitem__
+
+        manager = DiagnosticsManager(enabled=True)
+        with (
+            patch("prompy.prompt_render.diagnostics_manager", manager),
+            patch("prompy.jinja_extension.diagnostics_manager", manager),
+        ):
+            result = PromptRender(main_file).render(mock_context)
+
+        assert result == "[S] [S]"
+        root = manager.resolution_tree
+        assert [child.slug for child in root.children] == ["wrapper", "wrapper"]
+        for child in root.children:
+            assert [nested.slug for nested in child.children] == ["shared"]
+
+    def test_render_records_nothing_when_diagnostics_disabled(self):
+        """Test that renders skip diagnostics entirely while they are disabled."""
+        from prompy.diagnostics import diagnostics_manager
+
+        main_file = PromptFile(slug="main", markdown_template="Main {{ @fragment }}")
+        fragment_file = PromptFile(
+            slug="fragment", markdown_template="fragment content", arguments={}
+        )
+
+        mock_context = MagicMock(spec=PromptContext)
+        mock_context.load_slug.return_value = fragment_file
+
+        with (
+            patch.object(diagnostics_manager, "enabled", False),
+            patch.object(diagnostics_manager, "add_event") as mock_add_event,
+        ):
+            result = PromptRender(main_file).render(mock_context)
+
+        assert result == "Main fragment content"
+        mock_add_event.assert_not_called()
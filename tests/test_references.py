@@ -2,11 +2,17 @@
 Tests for updating references when fragments are moved.
 """
 
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 from prompy.prompt_context import PromptContext
 from prompy.prompt_file import PromptFile
-from prompy.references import update_references, update_references_in_file
+from prompy.references import (
+    update_references,
+    update_references_bulk,
+    update_references_in_file,
+    update_references_in_file_bulk,
+)
 
 
 def test_update_references_in_file(tmp_path):
@@ -77,6 +83,106 @@ Some text
     assert new_content == content
 
 
+def test_references_do_not_span_expressions(tmp_path):
+    """Test that a bare @slug between two expressions is left alone."""
+    file_path = tmp_path / "spanning.md"
+    content = """---
+description: A file with a bare reference between expressions
+---
+{{ greeting }} @test-fragment is mentioned here {{ name }}
+"""
+    file_path.write_text(content)
+
+    updated = update_references_in_file(file_path, "test-fragment", "new-fragment")
+
+    assert updated is False
+    assert file_path.read_text() == content
+
+
+def test_update_references_keeps_frontmatter_verbatim(tmp_path):
+    """Test that only the template body is rewritten when updating references."""
+    file_path = tmp_path / "formatted.md"
+    content = """---
+# A comment that a YAML round trip would drop
+description:   Mentions @test-fragment in the frontmatter
+---
+{{ @test-fragment }}
+"""
+    file_path.write_text(content)
+
+    updated = update_references_in_file(file_path, "test-fragment", "new-fragment")
+
+    assert updated is True
+    assert file_path.read_text() == content.replace(
+        "{{ @test-fragment }}", "{{ @new-fragment }}"
+    )
+
+
+def test_update_references_in_file_writes_through_symlink(tmp_path):
+    """Test that a symlinked prompt file stays a link to the updated target."""
+    target = tmp_path / "shared" / "target.md"
+    target.parent.mkdir()
+    target.write_text("{{ @old-fragment }}\n")
+    link = tmp_path / "link.md"
+    link.symlink_to(target)
+
+    assert update_references_in_file(link, "old-fragment", "new-fragment") is True
+
+    assert link.is_symlink()
+    assert target.read_text() == "{{ @new-fragment }}\n"
+
+
+def test_update_references_in_file_bulk(tmp_path):
+    """Test renaming several slugs in a single pass over a file."""
+    file_path = tmp_path / "bulk.md"
+    file_path.write_text("""---
+description: A file referencing several fragments
+---
+{{ @first }} {{ @second(arg1) }} {{ @first-extended }} {{ @other }}
+""")
+
+    updated = update_references_in_file_bulk(
+        file_path, {"first": "one", "second": "two", "missing": "none"}
+    )
+
+    assert updated is True
+    assert file_path.read_text().endswith(
+        "{{ @one }} {{ @two(arg1) }} {{ @first-extended }} {{ @other }}\n"
+    )
+
+    # Nothing left to rename
+    assert update_references_in_file_bulk(file_path, {"first": "one"}) is False
+    assert update_references_in_file_bulk(file_path, {}) is False
+
+
+def test_update_references_bulk_integration(tmp_path):
+    """Test the update_references_bulk function that updates all files."""
+    file1 = tmp_path / "file1.md"
+    file2 = tmp_path / "file2.md"
+    file1.write_text("{{ @first }} and {{ @second }}")
+    file2.write_text("{{ @unrelated }}")
+
+    mock_prompt_context = MagicMock(spec=PromptContext)
+    mock_prompt_files = SimpleNamespace()
+    mock_prompt_context.load_all.return_value = mock_prompt_files
+    mock_prompt_context.parse_prompt_slug = lambda slug: {
+        "file1": file1,
+        "file2": file2,
+    }.get(slug)
+    mock_prompt_files._fragment_prompts = {
+        "file1": MagicMock(spec=PromptFile),
+        "file2": MagicMock(spec=PromptFile),
+    }
+
+    results = update_references_bulk(
+        mock_prompt_context, {"first": "one", "second": "two"}
+    )
+
+    assert results == {str(file1): True, str(file2): False}
+    assert file1.read_text() == "{{ @one }} and {{ @two }}"
+    assert file2.read_text() == "{{ @unrelated }}"
+
+
 def test_update_references_integration(tmp_path):
     """Test the update_references function that updates all files."""
     # Create test directory structure
@@ -95,7 +201,7 @@ def test_update_references_integration(tmp_path):
 
     # Mock PromptContext and PromptFiles
     mock_prompt_context = MagicMock(spec=PromptContext)
-    mock_prompt_files = MagicMock()
+    mock_prompt_files = SimpleNamespace()
 
     # Setup mock for load_all to return our mock prompt_files
     mock_prompt_context.load_all.return_value = mock_prompt_files